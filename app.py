@@ -1,17 +1,31 @@
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
-import cv2
 import numpy as np
 import tempfile
 import os
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import random
 import time
 
+from optiqueue.backends import BACKEND_LABELS, BACKENDS, INT8_BACKEND, check_parity, save_backend_choice
+from optiqueue.inference_config import IMGSZ_CHOICES
+from optiqueue.lazy_imports import go, import_report, pd, px
+from optiqueue.model_pool import DEFAULT_WEIGHTS
+from optiqueue.quantization import quantize_and_compare
+from optiqueue.refilter import predict_candidates, refilter
+from optiqueue.roi import format_rect, parse_rect, resolve_roi
+from optiqueue.services import (
+    BACKEND_PATH,
+    activate_model_version,
+    load_batcher,
+    load_detection_cache,
+    load_inference_config,
+    load_model_pool,
+    load_model_registry,
+    model_load_error
+)
+from optiqueue.video_pipeline import VideoPipeline
+
 # Set page config
 st.set_page_config(
     page_title="YOLO Object Detection Dashboard",
@@ -171,6 +185,15 @@ st.markdown("""
 # Initialize session state for navigation
 if 'page' not in st.session_state:
     st.session_state.page = '🏠 Dashboard'
+if 'video_sampling' not in st.session_state:
+    st.session_state.video_sampling = {
+        'frame_stride': 1,
+        'sample_fps': 5.0,
+        'motion_threshold': 2.0,
+        'max_reuse_seconds': 2.0
+    }
+if 'video_roi' not in st.session_state:
+    st.session_state.video_roi = {'rect': None, 'scale': 1.0}
 
 # Header
 st.markdown("""
@@ -180,18 +203,6 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Load YOLO model
-@st.cache_resource
-def load_model():
-    try:
-        model = YOLO('best.pt')
-        return model
-    except Exception as e:
-        st.error(f"Error loading model: {e}")
-        return None
-
-model = load_model()
-
 # Sidebar for navigation and settings
 with st.sidebar:
     st.markdown("### 🚦 OptiQ Navigation")
@@ -209,32 +220,55 @@ with st.sidebar:
     
     st.markdown("---")
     
-    # Model info
-    if model:
+    # Load the shared YOLO model pool (one set of warmed-up instances per
+    # process) only on pages that need it, so Settings never pays for torch
+    if page_name in ("Dashboard", "Models", "Analytics"):
+        model = load_model_pool()
+        batcher = load_batcher()
+    else:
+        model = batcher = None
+    detection_cache = load_detection_cache()
+    
+    # Model info; the pool is only returned once every instance is warmed up
+    if model and model.warmup:
         st.success("✓ Model Loaded")
+        shapes = ', '.join(f"{shape['imgsz']}px×{shape['batch']}" for shape in model.warmup['shapes'])
+        st.caption(f"Warmed up in {model.warmup['seconds']:.1f}s ({shapes})")
+        if model.activation and model.activation['state'] == 'loading':
+            st.info("⏳ Warming up the new model version...")
+        elif model.warming:
+            st.info("⏳ Warming up the new image or batch size...")
+    elif page_name == "Settings" and (os.path.exists(DEFAULT_WEIGHTS) or load_model_registry().active()):
+        st.info("○ Model loads on detection pages")
     else:
         st.error("✗ Model Not Found")
     
     st.markdown("---")
     st.markdown("### 🎯 Detection Settings")
     
+    # Shared, persisted inference settings; the sliders adjust the thresholds for this session
+    inference_config = load_inference_config()
+    
     confidence_threshold = st.slider(
         "Confidence Threshold", 
-        0.0, 1.0, 0.25, 0.05,
+        0.0, 1.0, inference_config['conf'], 0.05,
         help="Minimum confidence score for detections"
     )
     
     iou_threshold = st.slider(
         "IOU Threshold", 
-        0.0, 1.0, 0.45, 0.05,
+        0.0, 1.0, inference_config['iou'], 0.05,
         help="Intersection over Union threshold for NMS"
     )
     
+    inference_options = inference_config.predict_kwargs(model.names if model else None)
+    inference_options.update(conf=confidence_threshold, iou=iou_threshold)
+    
     st.markdown("---")
     st.markdown("### 📷 Input Source")
     input_type = st.radio(
         "Select Input Type", 
-        ["📷 Image", "🎥 Video", "📹 Webcam"],
+        ["📷 Image", "🗂️ Batch", "🎥 Video", "📹 Webcam"],
         label_visibility="collapsed"
     )
     
@@ -251,6 +285,10 @@ with st.sidebar:
     st.metric("Images Processed", st.session_state.images_processed)
     st.metric("Total Detections", st.session_state.total_detections)
 
+# A weights file that exists but cannot be loaded is reported, not just "not found"
+if page_name in ("Dashboard", "Models", "Analytics") and model_load_error() is not None:
+    st.error(f"Error loading model: {model_load_error()}")
+
 # Page routing
 if page_name == "Dashboard":
     if model:
@@ -284,97 +322,181 @@ if page_name == "Dashboard":
                 
                 # Run inference button
                 st.markdown("---")
-                if st.button("🚀 Start Detection", use_container_width=True):
+                image_key = hash((uploaded_file.getvalue(), model.checksum, inference_options['imgsz'], repr(inference_options.get('classes'))))
+                run_detection = st.button("🚀 Start Detection", use_container_width=True)
+                if run_detection:
                     with st.spinner("🔍 Analyzing image..."):
                         start_time = datetime.now()
                         
-                        results = model.predict(
-                            image,
-                            conf=confidence_threshold,
-                            iou=iou_threshold
+                        # One low-threshold pass; the sliders are applied afterwards
+                        candidates = predict_candidates(
+                            model, image,
+                            cache=detection_cache,
+                            image_bytes=uploaded_file.getvalue(),
+                            **inference_options
                         )
                         
                         processing_time = (datetime.now() - start_time).total_seconds()
+                    
+                    st.session_state.image_candidates = {
+                        'key': image_key,
+                        'result': candidates,
+                        'processing_time': processing_time
+                    }
+                    
+                    # Update session stats
+                    st.session_state.images_processed += 1
+                
+                cached = st.session_state.get('image_candidates')
+                if cached is not None and cached['key'] == image_key:
+                    # Re-apply the current thresholds without another forward pass
+                    filter_start = time.perf_counter()
+                    results = [refilter(cached['result'], confidence_threshold, iou_threshold, inference_options['max_det'])]
+                    filter_ms = (time.perf_counter() - filter_start) * 1000
+                    processing_time = cached['processing_time']
+                    
+                    # Display results
+                    with col2:
+                        annotated_image = results[0].plot()
+                        result_placeholder.image(annotated_image, use_container_width=True)
+                    
+                    if not run_detection:
+                        st.caption(f"⚡ Thresholds re-applied in {filter_ms:.1f} ms without re-running inference")
+                    
+                    # Display detection statistics
+                    st.markdown("---")
+                    st.markdown("### 📊 Detection Analytics")
+                    
+                    if len(results[0].boxes) > 0:
+                        boxes = results[0].boxes
+                        classes = boxes.cls.cpu().numpy()
+                        confidences = boxes.conf.cpu().numpy()
                         
-                        # Display results
-                        with col2:
-                            annotated_image = results[0].plot()
-                            result_placeholder.image(annotated_image, use_container_width=True)
+                        # Update total detections
+                        if run_detection:
+                            st.session_state.total_detections += len(boxes)
                         
-                        # Update session stats
-                        st.session_state.images_processed += 1
+                        # Performance metrics with icons
+                        metric_cols = st.columns(4)
+                        with metric_cols[0]:
+                            st.markdown('<div class="metric-icon">⏱️</div>', unsafe_allow_html=True)
+                            st.metric("Processing Time", f"{processing_time:.2f}s")
+                        with metric_cols[1]:
+                            st.markdown('<div class="metric-icon">🎯</div>', unsafe_allow_html=True)
+                            st.metric("Total Objects", len(boxes))
+                        with metric_cols[2]:
+                            st.markdown('<div class="metric-icon">📊</div>', unsafe_allow_html=True)
+                            st.metric("Avg Confidence", f"{np.mean(confidences):.2%}")
+                        with metric_cols[3]:
+                            st.markdown('<div class="metric-icon">🏷️</div>', unsafe_allow_html=True)
+                            st.metric("Unique Classes", len(np.unique(classes)))
                         
-                        # Display detection statistics
                         st.markdown("---")
-                        st.markdown("### 📊 Detection Analytics")
                         
-                        if len(results[0].boxes) > 0:
-                            boxes = results[0].boxes
-                            classes = boxes.cls.cpu().numpy()
-                            confidences = boxes.conf.cpu().numpy()
-                            
-                            # Update total detections
-                            st.session_state.total_detections += len(boxes)
-                            
-                            # Performance metrics with icons
-                            metric_cols = st.columns(4)
-                            with metric_cols[0]:
-                                st.markdown('<div class="metric-icon">⏱️</div>', unsafe_allow_html=True)
-                                st.metric("Processing Time", f"{processing_time:.2f}s")
-                            with metric_cols[1]:
-                                st.markdown('<div class="metric-icon">🎯</div>', unsafe_allow_html=True)
-                                st.metric("Total Objects", len(boxes))
-                            with metric_cols[2]:
-                                st.markdown('<div class="metric-icon">📊</div>', unsafe_allow_html=True)
-                                st.metric("Avg Confidence", f"{np.mean(confidences):.2%}")
-                            with metric_cols[3]:
-                                st.markdown('<div class="metric-icon">🏷️</div>', unsafe_allow_html=True)
-                                st.metric("Unique Classes", len(np.unique(classes)))
-                            
-                            st.markdown("---")
-                            
-                            # Count detections per class
-                            class_counts = {}
-                            for cls_id, conf in zip(classes, confidences):
-                                cls_name = results[0].names[int(cls_id)]
-                                if cls_name not in class_counts:
-                                    class_counts[cls_name] = []
-                                class_counts[cls_name].append(conf)
-                            
-                            # Display class-wise statistics
-                            st.markdown("③ 📝 Detection Breakdown")
-                            stat_cols = st.columns(min(len(class_counts), 4))
-                            for idx, (cls_name, confs) in enumerate(class_counts.items()):
-                                with stat_cols[idx % 4]:
-                                    st.metric(
-                                        label=f"🟢 {cls_name.title()}",
-                                        value=f"{len(confs)} detected",
-                                        delta=f"Conf: {np.mean(confs):.2%}"
-                                    )
-                            
-                            # Download button for results
-                            st.markdown("---")
-                            from io import BytesIO
-                            
-                            # Convert annotated image to bytes
-                            annotated_pil = Image.fromarray(annotated_image)
-                            buf = BytesIO()
-                            annotated_pil.save(buf, format="PNG")
-                            byte_im = buf.getvalue()
-                            
-                            st.download_button(
-                                label="⬇️ Download Detection Results",
-                                data=byte_im,
-                                file_name=f"detection_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                                mime="image/png",
-                                use_container_width=True
-                            )
-                            
-                            # Success message with balloons
-                            st.success(f"✅ Detection complete! Found {len(boxes)} objects in {processing_time:.2f}s")
+                        # Count detections per class
+                        class_counts = {}
+                        for cls_id, conf in zip(classes, confidences):
+                            cls_name = results[0].names[int(cls_id)]
+                            if cls_name not in class_counts:
+                                class_counts[cls_name] = []
+                            class_counts[cls_name].append(conf)
+                        
+                        # Display class-wise statistics
+                        st.markdown("③ 📝 Detection Breakdown")
+                        stat_cols = st.columns(min(len(class_counts), 4))
+                        for idx, (cls_name, confs) in enumerate(class_counts.items()):
+                            with stat_cols[idx % 4]:
+                                st.metric(
+                                    label=f"🟢 {cls_name.title()}",
+                                    value=f"{len(confs)} detected",
+                                    delta=f"Conf: {np.mean(confs):.2%}"
+                                )
+                        
+                        # Download button for results
+                        st.markdown("---")
+                        from io import BytesIO
+                        
+                        # Convert annotated image to bytes
+                        annotated_pil = Image.fromarray(annotated_image)
+                        buf = BytesIO()
+                        annotated_pil.save(buf, format="PNG")
+                        byte_im = buf.getvalue()
+                        
+                        st.download_button(
+                            label="⬇️ Download Detection Results",
+                            data=byte_im,
+                            file_name=f"detection_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
+                            mime="image/png",
+                            use_container_width=True
+                        )
+                        
+                        # Success message with balloons
+                        st.success(f"✅ Detection complete! Found {len(boxes)} objects in {processing_time:.2f}s")
+                        if run_detection:
                             st.balloons()
-                        else:
-                            st.warning("⚠️ No objects detected. Try adjusting the confidence threshold.")
+                    else:
+                        st.warning("⚠️ No objects detected. Try adjusting the confidence threshold.")
+        
+        elif input_type == "Batch":
+            st.markdown("### 🗂️ Batch Image Detection")
+            st.markdown('<div class="info-box">🗂️ Upload several images; they are detected together in batched forward passes</div>', unsafe_allow_html=True)
+            
+            uploaded_files = st.file_uploader(
+                "Choose images...", 
+                type=["jpg", "jpeg", "png"],
+                accept_multiple_files=True,
+                help="Supported formats: JPG, JPEG, PNG"
+            )
+            
+            if uploaded_files:
+                st.markdown(f"**Files:** {len(uploaded_files)} | **Total Size:** {sum(f.size for f in uploaded_files) / 1024:.2f} KB")
+                
+                st.markdown("---")
+                if st.button("🚀 Detect All", use_container_width=True):
+                    with st.spinner(f"🔍 Analyzing {len(uploaded_files)} images..."):
+                        start_time = datetime.now()
+                        
+                        images = [Image.open(f) for f in uploaded_files]
+                        results = detection_cache.predict_many(
+                            batcher,
+                            images,
+                            [f.getvalue() for f in uploaded_files],
+                            **inference_options
+                        )
+                        
+                        processing_time = (datetime.now() - start_time).total_seconds()
+                    
+                    total_objects = sum(len(result.boxes) for result in results)
+                    st.session_state.images_processed += len(results)
+                    st.session_state.total_detections += total_objects
+                    
+                    metric_cols = st.columns(4)
+                    with metric_cols[0]:
+                        st.metric("⏱️ Processing Time", f"{processing_time:.2f}s")
+                    with metric_cols[1]:
+                        st.metric("🖼️ Images", len(results))
+                    with metric_cols[2]:
+                        st.metric("🎯 Total Objects", total_objects)
+                    with metric_cols[3]:
+                        st.metric("📈 Images/sec", f"{len(results) / max(processing_time, 1e-6):.1f}")
+                    
+                    st.markdown("---")
+                    st.markdown("③ ✨ Detection Results")
+                    
+                    summary_rows = []
+                    grid_cols = st.columns(3)
+                    for idx, (uploaded, result) in enumerate(zip(uploaded_files, results)):
+                        confidences = result.boxes.conf.cpu().numpy()
+                        summary_rows.append({
+                            'File': uploaded.name,
+                            'Objects': len(result.boxes),
+                            'Avg Confidence': f"{np.mean(confidences):.2%}" if len(confidences) else "N/A"
+                        })
+                        with grid_cols[idx % 3]:
+                            st.image(result.plot(), caption=uploaded.name, use_container_width=True)
+                    
+                    st.dataframe(pd.DataFrame(summary_rows), use_container_width=True, hide_index=True)
+                    st.success(f"✅ Batch complete! Found {total_objects} objects in {len(results)} images in {processing_time:.2f}s")
         
         elif input_type == "Video":
             st.markdown("### 🎥 Video Detection")
@@ -399,6 +521,7 @@ if page_name == "Dashboard":
                 # Save uploaded video to temporary file
                 tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
                 tfile.write(uploaded_video.read())
+                tfile.close()
                 
                 st.markdown("---")
                 if st.button("🚀 Process Video", use_container_width=True):
@@ -407,43 +530,23 @@ if page_name == "Dashboard":
                         progress_bar = st.progress(0)
                         status_text = st.empty()
                         
-                        # Run inference on video
-                        results = model.predict(
-                            tfile.name,
-                            conf=confidence_threshold,
-                            iou=iou_threshold,
-                            stream=True
-                        )
+                        def update_progress(done, total):
+                            if total > 0:
+                                progress_bar.progress(min(done / total, 1.0))
+                            status_text.text(f"Processing frame {done}/{total}")
                         
-                        # Process and save video with detections
+                        # Decode, inference, annotation and encode run as overlapping stages
                         output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+                        pipeline = VideoPipeline(
+                            batcher,
+                            sampling=st.session_state.video_sampling,
+                            roi=resolve_roi(st.session_state.video_roi),
+                            **inference_options
+                        )
+                        summary = pipeline.run(tfile.name, output_path, progress_callback=update_progress)
                         
-                        cap = cv2.VideoCapture(tfile.name)
-                        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        fps = int(cap.get(cv2.CAP_PROP_FPS))
-                        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                        
-                        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-                        
-                        frame_count = 0
-                        total_detections = 0
-                        
-                        for result in results:
-                            annotated_frame = result.plot()
-                            out.write(annotated_frame)
-                            
-                            frame_count += 1
-                            total_detections += len(result.boxes)
-                            
-                            # Update progress
-                            progress = frame_count / total_frames
-                            progress_bar.progress(progress)
-                            status_text.text(f"Processing frame {frame_count}/{total_frames}")
-                        
-                        cap.release()
-                        out.release()
+                        frame_count = summary['frames']
+                        total_detections = summary['detections']
                         
                         processing_time = (datetime.now() - start_time).total_seconds()
                         
@@ -470,6 +573,21 @@ if page_name == "Dashboard":
                         with metric_cols[3]:
                             st.metric("📈 Avg FPS", f"{frame_count / processing_time:.1f}")
                         
+                        st.caption(
+                            f"🧮 Inference ran on {summary['inferred_frames']} frames; "
+                            f"{summary['reused_frames']} frames reused the previous detections"
+                        )
+                        if summary['roi']:
+                            st.caption(
+                                f"✂️ Region of interest: {summary['roi']['pixel_reduction']:.0%} fewer source pixels, "
+                                f"{summary['roi']['input_reduction']:.0%} smaller model input, "
+                                f"~{summary['roi']['latency_saved_ms']:.1f} ms saved per inferred frame"
+                            )
+                        
+                        # Per-stage throughput
+                        st.markdown("③ ⚙️ Pipeline Stages")
+                        st.dataframe(pd.DataFrame(summary['stages']), use_container_width=True, hide_index=True)
+                        
                         # Download button for processed video
                         with open(output_path, 'rb') as f:
                             st.download_button(
@@ -501,15 +619,27 @@ if page_name == "Dashboard":
                     st.image(image, use_container_width=True)
                 
                 with st.spinner("🔍 Analyzing capture..."):
-                    start_time = datetime.now()
-                    
-                    results = model.predict(
-                        image,
-                        conf=confidence_threshold,
-                        iou=iou_threshold
-                    )
+                    # Slider changes rerun the script; only a new capture needs inference
+                    capture_key = hash((camera_photo.getvalue(), model.checksum, inference_options['imgsz'], repr(inference_options.get('classes'))))
+                    cached = st.session_state.get('webcam_candidates')
+                    if cached is None or cached['key'] != capture_key:
+                        start_time = datetime.now()
+                        # Captures from concurrent sessions share forward passes
+                        candidates = predict_candidates(
+                            batcher, image,
+                            cache=detection_cache,
+                            image_bytes=camera_photo.getvalue(),
+                            **inference_options
+                        )
+                        cached = {
+                            'key': capture_key,
+                            'result': candidates,
+                            'processing_time': (datetime.now() - start_time).total_seconds()
+                        }
+                        st.session_state.webcam_candidates = cached
                     
-                    processing_time = (datetime.now() - start_time).total_seconds()
+                    results = [refilter(cached['result'], confidence_threshold, iou_threshold, inference_options['max_det'])]
+                    processing_time = cached['processing_time']
                     
                     with col2:
                         st.markdown("③ ✨ Detection Results")
@@ -574,6 +704,9 @@ if page_name == "Dashboard":
 elif page_name == "Models":
     st.header("🤖 Model Management")
     
+    model_registry = load_model_registry()
+    active_version = model_registry.active()
+    
     # Current model info
     st.subheader("Current Model Information")
     
@@ -586,7 +719,7 @@ elif page_name == "Models":
         
         with col2:
             st.markdown('<div class="metric-icon">💾</div>', unsafe_allow_html=True)
-            st.info("**Model File:** best.pt")
+            st.info(f"**Model File:** {active_version['name'] if active_version else 'best.pt'}")
         
         with col3:
             st.markdown('<div class="metric-icon">✅</div>', unsafe_allow_html=True)
@@ -617,13 +750,127 @@ elif page_name == "Models":
         with perf_cols[2]:
             avg_per_image = st.session_state.total_detections / max(st.session_state.images_processed, 1)
             st.metric("Avg Detections/Image", f"{avg_per_image:.1f}")
+        
+        # Inference backend
+        st.markdown("---")
+        st.subheader("⚙️ Inference Backend")
+        st.markdown('<div class="info-box">ONNX Runtime and OpenVINO run a graph exported once from the active weights and cached by their checksum</div>', unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            backend = st.selectbox(
+                "Backend", BACKENDS, index=BACKENDS.index(model.backend), format_func=BACKEND_LABELS.get
+            )
+            st.caption(f"Active: {BACKEND_LABELS[model.backend]} · {model.size} instances · warmed up in {model.warmup['seconds']:.1f}s"
+                       + (" · warming up the new image or batch size" if model.warming else ""))
+            if st.button("Activate Backend", use_container_width=True, disabled=backend == model.backend or model.activating):
+                with st.spinner(f"Exporting and loading {BACKEND_LABELS[backend]}..."):
+                    try:
+                        model.use_backend(backend)
+                        save_backend_choice(BACKEND_PATH, backend)
+                        st.success(f"✅ {BACKEND_LABELS[backend]} is now serving detections")
+                    except Exception as e:
+                        st.error(f"Could not load {BACKEND_LABELS[backend]}: {e}")
+        
+        with col2:
+            parity_image = st.file_uploader("Parity Check Image", type=['jpg', 'jpeg', 'png'], key="parity_image")
+            if parity_image and st.button("🔬 Compare with PyTorch", use_container_width=True):
+                with st.spinner("Running both backends..."):
+                    parity = check_parity(model.weights, model, Image.open(parity_image))
+                parity_cols = st.columns(3)
+                parity_cols[0].metric("Matched Boxes", f"{parity['matched']}/{parity['reference']}")
+                parity_cols[1].metric("Max Box Error", f"{parity['max_box_error']:.1f}px")
+                parity_cols[2].metric("Max Conf. Diff", f"{parity['max_conf_diff']:.3f}")
+        
+        # INT8 quantization
+        st.markdown("---")
+        st.subheader("🧪 INT8 Quantization")
+        st.markdown('<div class="info-box">Quantize the ONNX export with local calibration images, compare it with FP32, then activate it</div>', unsafe_allow_html=True)
+        
+        calib_col, eval_col = st.columns(2)
+        with calib_col:
+            calibration_dir = st.text_input(
+                "Calibration Images Folder", placeholder="e.g. data/calibration",
+                help="A few hundred representative frames from your cameras"
+            )
+        with eval_col:
+            eval_dir = st.text_input(
+                "Labeled Evaluation Set (Optional)", placeholder="e.g. data/val",
+                help="YOLO-format images/ and labels/ folders; without it only latency is compared"
+            )
+        
+        if st.button("🧪 Quantize and Compare", use_container_width=True, disabled=not calibration_dir):
+            with st.spinner("Calibrating, quantizing and evaluating FP32 vs INT8..."):
+                try:
+                    st.session_state.int8_report = quantize_and_compare(
+                        model.weights, model.artifact_dir, model.weights_checksum, calibration_dir, eval_dir or None
+                    )
+                except Exception as e:
+                    st.error(f"Quantization failed: {e}")
+        
+        int8_report = st.session_state.get('int8_report')
+        if int8_report:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Model': name,
+                    'mAP@0.5': f"{report['map50']:.3f}" if report['map50'] is not None else 'N/A',
+                    'mAP@0.5:0.95': f"{report['map50_95']:.3f}" if report['map50_95'] is not None else 'N/A',
+                    'Latency (ms/image)': f"{report['latency_ms']:.1f}",
+                    'Size (MB)': f"{report['size_mb']:.1f}"
+                }
+                for name, report in (('FP32', int8_report['fp32']), ('INT8', int8_report['int8']))
+            ]), use_container_width=True, hide_index=True)
+            speedup = int8_report['fp32']['latency_ms'] / max(int8_report['int8']['latency_ms'], 1e-6)
+            st.caption(
+                f"Calibrated on {int8_report['calibration_images']} images · "
+                f"INT8 is {speedup:.2f}x the FP32 speed on {int8_report['int8']['images']} images"
+            )
+            if model.backend != INT8_BACKEND and st.button("Activate INT8 Model", use_container_width=True, disabled=model.activating):
+                with st.spinner("Loading the INT8 model..."):
+                    try:
+                        model.use_backend(INT8_BACKEND)
+                        save_backend_choice(BACKEND_PATH, INT8_BACKEND)
+                        st.success("✅ The INT8 model is now serving detections")
+                    except Exception as e:
+                        st.error(f"Could not load the INT8 model: {e}")
     else:
         st.error("⚠️ No model loaded. Please ensure best.pt is in the project directory.")
     
+    # Model versions
+    st.markdown("---")
+    st.subheader("🗂️ Model Versions")
+    st.markdown('<div class="info-box">Every uploaded model is kept as a version. Activating one loads and warms it up in the background; detection keeps running on the current model until the new one takes over.</div>', unsafe_allow_html=True)
+    
+    activation = model.activation if model else None
+    loading = activation is not None and activation['state'] == 'loading'
+    if loading:
+        st.info("⏳ Loading and warming up the new model...")
+        if st.button("🔄 Refresh Status"):
+            st.rerun()
+    elif activation is not None and activation['state'] == 'failed':
+        st.error(f"❌ Model activation failed: {activation['error']}")
+    elif activation is not None and activation['state'] == 'ready':
+        st.success("✅ The new model is serving detections")
+    
+    for version in model_registry.versions():
+        is_active = active_version is not None and version['id'] == active_version['id']
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**{version['name']}** · version {version['id']} · {version['size'] / (1024*1024):.2f} MB"
+                     + (" · ✅ Active" if is_active else ""))
+        with col2:
+            if not is_active and st.button("Activate", key=f"activate_{version['id']}", disabled=loading,
+                                           use_container_width=True):
+                if activate_model_version(version['id']):
+                    st.rerun()
+                else:
+                    st.warning("Another model is still loading")
+    
     # Upload new model section
     st.markdown("---")
     st.subheader("📤 Upload New Model")
-    st.markdown('<div class="info-box">Upload a new YOLOv8 model (.pt file) to replace the current model</div>', unsafe_allow_html=True)
+    st.markdown('<div class="info-box">Upload a new YOLOv8 model (.pt file) as a new version; it replaces the current model without a restart</div>', unsafe_allow_html=True)
     
     new_model = st.file_uploader("Select .pt model file", type=['pt'])
     
@@ -633,12 +880,14 @@ elif page_name == "Models":
             st.write(f"**Selected:** {new_model.name}")
             st.write(f"**Size:** {new_model.size / (1024*1024):.2f} MB")
         with col2:
-            if st.button("Upload Model", use_container_width=True):
-                with st.spinner("Uploading model..."):
-                    with open('best.pt', 'wb') as f:
-                        f.write(new_model.read())
-                    st.success("✅ Model uploaded successfully!")
-                    st.info("Please restart the application to load the new model.")
+            if st.button("Upload and Activate", use_container_width=True):
+                version = model_registry.add(new_model.getvalue(), new_model.name)
+                if active_version is not None and version['id'] == active_version['id']:
+                    st.info("This model is already active.")
+                elif activate_model_version(version['id']):
+                    st.rerun()
+                else:
+                    st.warning(f"Saved as version {version['id']}; another model is still loading")
 
 elif page_name == "Analytics":
     st.header("📊 Detection Analytics")
@@ -723,16 +972,96 @@ elif page_name == "Settings":
     
     # Detection Settings
     st.subheader("🎯 Detection Configuration")
+    st.markdown('<div class="info-box">Shared by every page, camera and video job and kept across restarts. A smaller image size, fewer classes and a lower detection cap trade accuracy for latency.</div>', unsafe_allow_html=True)
+    
+    config = inference_config.get()
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        default_conf = st.slider("Default Confidence Threshold", 0.0, 1.0, config['conf'], 0.05)
+        default_iou = st.slider("Default IoU Threshold", 0.0, 1.0, config['iou'], 0.05)
+        batch_size = st.number_input(
+            "Batch Size", min_value=1, max_value=64, value=config['batch_size'],
+            help="Frames per forward pass for cameras, videos and image batches"
+        )
+    
+    with col2:
+        max_det = st.number_input("Maximum Detections", min_value=1, max_value=1000, value=min(config['max_det'], 1000))
+        img_size = st.selectbox(
+            "Image Size", IMGSZ_CHOICES,
+            index=IMGSZ_CHOICES.index(config['imgsz']) if config['imgsz'] in IMGSZ_CHOICES else IMGSZ_CHOICES.index(640)
+        )
+        classes_text = st.text_input(
+            "Detect Classes", value=', '.join(config['classes']), placeholder="e.g. person",
+            help="Comma-separated class names; leave blank to detect every class"
+        )
+        half = st.selectbox("Precision", ["FP32", "FP16 (GPU only)"], index=int(config['half'])) != "FP32"
+    
+    st.caption("INT8 runs as the ONNX Runtime INT8 backend: quantize and activate it on the Models page.")
+    
+    st.markdown("---")
+    
+    # Video frame sampling
+    st.subheader("🎞️ Video Frame Sampling")
+    st.markdown('<div class="info-box">Frames that are not selected reuse the previous detections, which cuts inference cost on long, mostly static clips.</div>', unsafe_allow_html=True)
+    
+    sampling = st.session_state.video_sampling
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        frame_stride = st.number_input(
+            "Frame Stride", min_value=1, max_value=60, value=int(sampling['frame_stride']),
+            help="Only every N-th frame is considered for inference"
+        )
+        sample_fps = st.number_input(
+            "Max Inference Rate (frames/sec of video)", min_value=0.0, max_value=60.0,
+            value=float(sampling['sample_fps']), step=0.5,
+            help="0 disables time-based sampling"
+        )
+    
+    with col2:
+        motion_threshold = st.slider(
+            "Motion Gate Threshold", 0.0, 20.0, float(sampling['motion_threshold']), 0.5,
+            help="Mean grayscale difference below which a frame counts as static (0 disables the gate)"
+        )
+        max_reuse_seconds = st.slider(
+            "Max Reuse Interval (s)", 0.5, 10.0, float(sampling['max_reuse_seconds']), 0.5,
+            help="Static scenes are still re-detected at least this often"
+        )
+    
+    st.session_state.video_sampling = {
+        'frame_stride': frame_stride,
+        'sample_fps': sample_fps,
+        'motion_threshold': motion_threshold,
+        'max_reuse_seconds': max_reuse_seconds
+    }
+    
+    st.markdown("---")
+    
+    # Video region of interest
+    st.subheader("✂️ Video Region of Interest")
+    st.markdown('<div class="info-box">Only this part of each frame is sent to the model; detections are mapped back onto the full frame.</div>', unsafe_allow_html=True)
     
+    video_roi = st.session_state.video_roi
     col1, col2 = st.columns(2)
     
     with col1:
-        default_conf = st.slider("Default Confidence Threshold", 0.0, 1.0, 0.25, 0.05)
-        default_iou = st.slider("Default IoU Threshold", 0.0, 1.0, 0.45, 0.05)
+        roi_text = st.text_input(
+            "Crop Region (x1,y1,x2,y2)", value=format_rect(video_roi['rect']),
+            placeholder="e.g. 0.2,0.3,0.8,1.0",
+            help="Fractions of the frame; leave blank to use the whole frame"
+        )
     
     with col2:
-        max_det = st.number_input("Maximum Detections", min_value=1, max_value=1000, value=300)
-        img_size = st.selectbox("Image Size", [320, 480, 640, 1280], index=2)
+        roi_scale = st.slider(
+            "Downscale Factor", 0.25, 1.0, float(video_roi['scale']), 0.05,
+            help="The crop is resized by this factor before inference"
+        )
+    
+    try:
+        st.session_state.video_roi = {'rect': parse_rect(roi_text), 'scale': roi_scale}
+    except ValueError as e:
+        st.error(f"Invalid crop region: {e}")
     
     st.markdown("---")
     
@@ -768,8 +1097,20 @@ elif page_name == "Settings":
     
     with col2:
         if st.button("💾 Save Settings", use_container_width=True):
-            st.success("✅ Settings saved successfully!")
-            st.balloons()
+            try:
+                inference_config.update(
+                    conf=default_conf,
+                    iou=default_iou,
+                    imgsz=img_size,
+                    max_det=max_det,
+                    classes=classes_text.split(','),
+                    half=half,
+                    batch_size=batch_size
+                )
+                st.success("✅ Settings saved successfully!")
+                st.balloons()
+            except ValueError as e:
+                st.error(f"Invalid settings: {e}")
     
     # Reset to defaults
     st.markdown("---")
@@ -779,6 +1120,7 @@ elif page_name == "Settings":
     
     with col1:
         if st.button("🔄 Reset to Defaults", use_container_width=True):
+            inference_config.reset()
             st.info("Settings reset to default values.")
     
     with col2:
@@ -787,3 +1129,8 @@ elif page_name == "Settings":
             st.session_state.total_detections = 0
             st.success("Session data cleared!")
             st.rerun()
+    
+    # Import timings of the lazily loaded ML/video/charting stack
+    st.markdown("---")
+    with st.expander("⏱️ Import Timings"):
+        st.dataframe(import_report(), use_container_width=True, hide_index=True)
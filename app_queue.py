@@ -1,16 +1,43 @@
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
-import cv2
 import numpy as np
 import tempfile
 import os
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import random
 import time
+import uuid
+
+from optiqueue.backends import BACKEND_LABELS, BACKENDS, INT8_BACKEND, check_parity, save_backend_choice
+from optiqueue.camera_ingest import camera_key
+from optiqueue.lazy_imports import go, import_report, pd
+from optiqueue.heatmap import DAYS
+from optiqueue.inference_config import IMGSZ_CHOICES
+from optiqueue.quantization import quantize_and_compare
+from optiqueue.queue_metrics import hourly_profile
+from optiqueue.roi import format_rect, parse_rect, resolve_roi
+from optiqueue.tiling import TiledModel
+from optiqueue.zones import format_zones, parse_zones
+from optiqueue.services import (
+    BACKEND_PATH,
+    activate_model_version,
+    load_camera_ingest,
+    load_camera_registry,
+    load_camera_scheduler,
+    load_detection_archive,
+    load_detection_buffer,
+    load_detection_cache,
+    load_detection_store,
+    load_heatmap,
+    load_inference_config,
+    load_model_pool,
+    load_model_registry,
+    load_queue_metrics,
+    load_queue_tracker,
+    load_video_jobs,
+    load_zone_registry,
+    model_load_error
+)
 
 # Page config
 st.set_page_config(
@@ -23,19 +50,32 @@ st.set_page_config(
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'Dashboard'
-if 'cameras' not in st.session_state:
-    st.session_state.cameras = []
-if 'models' not in st.session_state:
-    st.session_state.models = [{'name': 'best.pt', 'status': 'Active', 'accuracy': '94.2%'}]
-if 'detections' not in st.session_state:
-    st.session_state.detections = []
-if 'avg_queue_length' not in st.session_state:
-    st.session_state.avg_queue_length = random.randint(8, 15)
-if 'avg_wait_time' not in st.session_state:
-    st.session_state.avg_wait_time = random.randint(3, 8)
+if 'video_jobs' not in st.session_state:
+    st.session_state.video_jobs = []
 if 'active_alerts' not in st.session_state:
     st.session_state.active_alerts = random.randint(0, 3)
 
+# Cameras are process-wide and persisted: every session sees the same list,
+# and readers of cameras removed anywhere are stopped here
+camera_registry = load_camera_registry()
+cameras = camera_registry.cameras()
+camera_ingest = load_camera_ingest()
+camera_ingest.sync(cameras)
+# Starts the background roll of detection history into Parquet
+load_detection_archive()
+# The scheduler (and with it the model) is only loaded once a camera has a stream
+camera_scheduler = None
+if any(camera.get('url') for camera in cameras):
+    camera_scheduler = load_camera_scheduler()
+if camera_scheduler is not None:
+    for camera in cameras:
+        camera_scheduler.set_target(camera_key(camera), camera.get('target_hz'))
+        camera_scheduler.set_roi(camera_key(camera), resolve_roi(camera.get('roi'), camera.get('zones')))
+        camera_scheduler.set_tiling(camera_key(camera), camera.get('tiled'))
+zone_registry = load_zone_registry()
+for camera in cameras:
+    zone_registry.set(camera_key(camera), camera.get('zones', []))
+
 # Custom CSS for dark theme with glowing effects
 st.markdown("""
 <style>
@@ -380,13 +420,68 @@ with st.sidebar:
             st.rerun()
 
 # Helper functions
-def generate_queue_data():
-    """Generate simulated queue data for charts"""
-    hours = list(range(24))
-    queue_lengths = [random.randint(2, 20) for _ in hours]
-    wait_times = [random.randint(1, 10) for _ in hours]
+def camera_status_chip(stats):
+    """Status chip markup for a camera's ingest state"""
+    if stats is None:
+        return '<span class="status-chip status-warning">● No Stream</span>'
+    if stats['status'] == 'live':
+        return '<span class="status-chip status-success">● Live</span>'
+    if stats['status'] in ('connecting', 'reconnecting'):
+        return f'<span class="status-chip status-warning">● {stats["status"].title()}</span>'
+    return '<span class="status-chip status-error">● Offline</span>'
+
+def get_queue_data():
+    """Last 24 hourly buckets of queue length and wait time from live inference"""
+    queue_metrics = load_queue_metrics()
+    starts, queue_lengths, _ = queue_metrics.series('queue_length', '1h', 24)
+    _, wait_times, _ = queue_metrics.series('wait_time', '1h', 24, combine='mean')
+    hours = [datetime.fromtimestamp(ts).strftime('%H:00') for ts in starts]
     return hours, queue_lengths, wait_times
 
+def get_kpis():
+    """Measured queue length, wait time and peak hour for the KPI cards"""
+    queue_metrics = load_queue_metrics()
+    starts, queue_lengths, _ = queue_metrics.series('queue_length', '1h', 25)
+    _, wait_times, _ = queue_metrics.series('wait_time', '1h', 25, combine='mean')
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    today = (starts >= midnight) & ~np.isnan(queue_lengths)
+    peak_hour = None
+    if today.any():
+        peak_hour = datetime.fromtimestamp(starts[today][np.argmax(queue_lengths[today])]).strftime('%H:00')
+    # The current hour is compared with the same hour yesterday
+    return {
+        'queue_length': queue_lengths[-1],
+        'queue_length_yesterday': queue_lengths[0],
+        'wait_time': wait_times[-1],
+        'wait_time_yesterday': wait_times[0],
+        'peak_hour': peak_hour,
+    }
+
+def format_change(current, previous):
+    """Change vs yesterday, e.g. '↓ 12% from yesterday'"""
+    if np.isnan(current) or np.isnan(previous) or previous == 0:
+        return "No data from yesterday"
+    change = (current - previous) / previous
+    return f"{'↑' if change > 0 else '↓'} {abs(change):.0%} from yesterday"
+
+def format_kpi(value, unit=""):
+    return "—" if np.isnan(value) else f"{value:.1f}{unit}"
+
+def get_range_data(range_start, range_end):
+    """Hour-of-day queue length and wait time plus the weekday x hour heatmap for a date range"""
+    detection_store = load_detection_store()
+    start = datetime.combine(range_start, datetime.min.time()).timestamp()
+    end = datetime.combine(range_end, datetime.min.time()).timestamp()
+    queue_starts, queue_values = detection_store.rollup('queue_length', start, end)
+    wait_starts, wait_values = detection_store.rollup('wait_time', start, end, combine='mean')
+    hours = [f"{hour:02d}:00" for hour in range(24)]
+    return (
+        hours,
+        hourly_profile(queue_starts, queue_values),
+        hourly_profile(wait_starts, wait_values),
+        load_heatmap().profile(start=range_start, end=range_end - timedelta(days=1))
+    )
+
 def create_line_chart(hours, values, title, y_label):
     """Create a styled line chart for analytics"""
     fig = go.Figure()
@@ -412,14 +507,6 @@ def create_line_chart(hours, values, title, y_label):
     )
     return fig
 
-def load_yolo_model():
-    """Load YOLO model"""
-    try:
-        model = YOLO('best.pt')
-        return model
-    except Exception as e:
-        return None
-
 # Main content based on selected page
 if st.session_state.page == "Dashboard":
     # Header
@@ -432,14 +519,15 @@ if st.session_state.page == "Dashboard":
     
     # KPI Cards
     col1, col2, col3, col4 = st.columns(4, gap="large")
+    kpis = get_kpis()
     
     with col1:
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-icon">👥</div>
             <div class="kpi-title">Avg Queue Length</div>
-            <div class="kpi-value">{st.session_state.avg_queue_length}</div>
-            <p style="color: #10b981; font-size: 0.9rem; margin: 0;">↓ 12% from yesterday</p>
+            <div class="kpi-value">{format_kpi(kpis['queue_length'])}</div>
+            <p style="color: #10b981; font-size: 0.9rem; margin: 0;">{format_change(kpis['queue_length'], kpis['queue_length_yesterday'])}</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -448,13 +536,13 @@ if st.session_state.page == "Dashboard":
         <div class="kpi-card">
             <div class="kpi-icon">⏱️</div>
             <div class="kpi-title">Avg Wait Time</div>
-            <div class="kpi-value">{st.session_state.avg_wait_time} min</div>
-            <p style="color: #10b981; font-size: 0.9rem; margin: 0;">↓ 8% from yesterday</p>
+            <div class="kpi-value">{format_kpi(kpis['wait_time'], " min")}</div>
+            <p style="color: #10b981; font-size: 0.9rem; margin: 0;">{format_change(kpis['wait_time'], kpis['wait_time_yesterday'])}</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        peak_hour = f"{random.randint(14, 18)}:00"
+        peak_hour = kpis['peak_hour'] or "—"
         st.markdown(f"""
         <div class="kpi-card">
             <div class="kpi-icon">📊</div>
@@ -488,7 +576,7 @@ if st.session_state.page == "Dashboard":
             <div class="panel-header">📹 Live Queue Cameras</div>
         """, unsafe_allow_html=True)
         
-        if len(st.session_state.cameras) == 0:
+        if len(cameras) == 0:
             st.markdown("""
             <div class="info-box">
                 <h4 style="margin-top: 0;">No cameras configured</h4>
@@ -497,15 +585,27 @@ if st.session_state.page == "Dashboard":
             """, unsafe_allow_html=True)
         else:
             cam_cols = st.columns(2)
-            for idx, camera in enumerate(st.session_state.cameras):
+            for idx, camera in enumerate(cameras):
+                stats = camera_ingest.stats(camera_key(camera))
                 with cam_cols[idx % 2]:
+                    fps_text = f" · {stats['fps']:.1f} FPS" if stats and stats['status'] == 'live' else ""
                     st.markdown(f"""
                     <div class="camera-card">
                         <h4 style="color: #ffffff; margin-top: 0;">📷 {camera['name']}</h4>
-                        <p style="color: #9ca3af;">Location: {camera['location']}</p>
-                        <span class="status-chip status-success">● Live</span>
+                        <p style="color: #9ca3af;">Location: {camera['location']}{fps_text}</p>
+                        {camera_status_chip(stats)}
                     </div>
                     """, unsafe_allow_html=True)
+                    
+                    # Prefer the latest annotated detection; fall back to the raw frame
+                    result, _ = camera_scheduler.latest(camera_key(camera)) if camera_scheduler else (None, None)
+                    reader = camera_ingest.reader(camera_key(camera))
+                    if result is not None:
+                        st.image(result.plot()[:, :, ::-1], caption=f"{len(result.boxes)} detected", use_container_width=True)
+                    elif reader is not None:
+                        _, _, frame = reader.buffer.peek()
+                        if frame is not None:
+                            st.image(frame[:, :, ::-1], use_container_width=True)
         
         if st.button("➕ Add New Camera", use_container_width=True):
             st.session_state.page = "Cameras"
@@ -519,17 +619,18 @@ if st.session_state.page == "Dashboard":
             <div class="panel-header">📝 Recent Detections</div>
         """, unsafe_allow_html=True)
         
-        if len(st.session_state.detections) == 0:
+        recent_detections = load_detection_store().tail(5)
+        if len(recent_detections) == 0:
             st.info("No recent detections. Upload images to start detecting.")
         else:
-            for detection in st.session_state.detections[-5:]:
+            for detection in recent_detections:
                 status_class = "status-success" if detection['confidence'] > 0.7 else "status-warning"
                 st.markdown(f"""
                 <div class="detection-card">
                     <div>
                         <strong style="color: #ffffff;">{detection['class']}</strong>
                         <p style="color: #9ca3af; margin: 0.3rem 0; font-size: 0.85rem;">
-                            {detection['time']}
+                            {datetime.fromtimestamp(detection['ts']).strftime("%H:%M:%S")} · {detection['camera']}
                         </p>
                     </div>
                     <div>
@@ -547,7 +648,7 @@ if st.session_state.page == "Dashboard":
     
     col_chart1, col_chart2 = st.columns(2, gap="large")
     
-    hours, queue_lengths, wait_times = generate_queue_data()
+    hours, queue_lengths, wait_times = get_queue_data()
     
     with col_chart1:
         st.markdown('<div class="panel-card">', unsafe_allow_html=True)
@@ -581,15 +682,35 @@ elif st.session_state.page == "Cameras":
             camera_name = st.text_input("Camera Name", placeholder="e.g., Front Entrance")
             camera_location = st.text_input("Location", placeholder="e.g., Main Hall")
             camera_url = st.text_input("RTSP URL", placeholder="rtsp://...")
+            camera_hz = st.number_input("Detection Rate (Hz)", min_value=0.1, max_value=30.0, value=2.0, step=0.5)
+            camera_zones = st.text_area(
+                "Zones (Optional)",
+                placeholder="lane 1 | queue | 0.1,0.4 0.5,0.4 0.5,1 0.1,1\ncounter | service | 0.6,0.2 0.9,0.2 0.9,0.6 0.6,0.6",
+                help="One zone per line: name | queue, service or exit | polygon points as x,y fractions of the frame"
+            )
             
             submitted = st.form_submit_button("Add Camera", use_container_width=True)
-            if submitted and camera_name and camera_location:
-                st.session_state.cameras.append({
+            try:
+                zones = parse_zones(camera_zones)
+            except ValueError as e:
+                zones = None
+                if submitted:
+                    st.error(f"Invalid zones: {e}")
+            if submitted and camera_name and camera_location and zones is not None:
+                camera_id = uuid.uuid4().hex[:8]
+                camera_registry.add({
+                    'id': camera_id,
                     'name': camera_name,
                     'location': camera_location,
                     'url': camera_url,
+                    'target_hz': camera_hz,
+                    'zones': zones,
                     'status': 'Active'
                 })
+                camera_ingest.ensure(camera_id, camera_url)
+                zone_registry.set(camera_id, zones)
+                if camera_scheduler is not None:
+                    camera_scheduler.set_target(camera_id, camera_hz)
                 st.success(f"✅ Camera '{camera_name}' added successfully!")
                 st.rerun()
         
@@ -597,12 +718,12 @@ elif st.session_state.page == "Cameras":
     
     with col2:
         st.markdown('<div class="panel-card">', unsafe_allow_html=True)
-        st.markdown(f'<div class="panel-header">📹 Active Cameras ({len(st.session_state.cameras)})</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="panel-header">📹 Active Cameras ({len(cameras)})</div>', unsafe_allow_html=True)
         
-        if len(st.session_state.cameras) == 0:
+        if len(cameras) == 0:
             st.info("No cameras configured. Add your first camera using the form.")
         else:
-            for idx, camera in enumerate(st.session_state.cameras):
+            for idx, camera in enumerate(cameras):
                 col_cam, col_btn = st.columns([3, 1])
                 with col_cam:
                     st.markdown(f"""
@@ -612,12 +733,66 @@ elif st.session_state.page == "Cameras":
                             📍 {camera['location']}<br>
                             🔗 {camera.get('url', 'N/A')}
                         </p>
-                        <span class="status-chip status-active">● Active</span>
+                        {camera_status_chip(camera_ingest.stats(camera_key(camera)))}
                     </div>
                     """, unsafe_allow_html=True)
+                    with st.expander(f"🧭 Zones ({len(camera.get('zones', []))})"):
+                        zones_text = st.text_area(
+                            "Zones",
+                            value=format_zones(camera.get('zones', [])),
+                            key=f"zones_{camera_key(camera)}",
+                            help="One zone per line: name | queue, service or exit | polygon points as x,y fractions of the frame"
+                        )
+                        if st.button("Save Zones", key=f"save_zones_{camera_key(camera)}"):
+                            try:
+                                camera['zones'] = parse_zones(zones_text)
+                                camera_registry.update(camera_key(camera), zones=camera['zones'])
+                                zone_registry.set(camera_key(camera), camera['zones'])
+                                if camera_scheduler is not None:
+                                    camera_scheduler.set_roi(camera_key(camera), resolve_roi(camera.get('roi'), camera['zones']))
+                                st.success("Zones saved")
+                            except ValueError as e:
+                                st.error(f"Invalid zones: {e}")
+                    roi = camera.get('roi') or {}
+                    with st.expander(f"✂️ Inference Region ({'on' if resolve_roi(roi, camera.get('zones')) else 'full frame'})"):
+                        roi_text = st.text_input(
+                            "Crop Region (x1,y1,x2,y2)",
+                            value=format_rect(roi.get('rect')),
+                            key=f"roi_{camera_key(camera)}",
+                            help="Fractions of the frame; leave blank for the whole frame"
+                        )
+                        crop_to_zones = st.checkbox(
+                            "Crop to zones",
+                            value=bool(roi.get('crop_to_zones')),
+                            key=f"roi_zones_{camera_key(camera)}",
+                            help="Without a crop region, use the rectangle around this camera's zones"
+                        )
+                        roi_scale = st.slider(
+                            "Downscale Factor", 0.25, 1.0, float(roi.get('scale', 1.0)), 0.05,
+                            key=f"roi_scale_{camera_key(camera)}"
+                        )
+                        tiled = st.checkbox(
+                            "🧩 Tiled inference",
+                            value=bool(camera.get('tiled')),
+                            key=f"tiled_{camera_key(camera)}",
+                            help="Detect on overlapping tiles at full resolution; for small people on high-resolution cameras"
+                        )
+                        if st.button("Save Region", key=f"save_roi_{camera_key(camera)}"):
+                            try:
+                                camera['roi'] = {'rect': parse_rect(roi_text), 'crop_to_zones': crop_to_zones, 'scale': roi_scale}
+                                camera['tiled'] = tiled
+                                camera_registry.update(camera_key(camera), roi=camera['roi'], tiled=tiled)
+                                if camera_scheduler is not None:
+                                    camera_scheduler.set_roi(camera_key(camera), resolve_roi(camera['roi'], camera.get('zones')))
+                                    camera_scheduler.set_tiling(camera_key(camera), tiled)
+                                st.success("Region saved")
+                            except ValueError as e:
+                                st.error(f"Invalid crop region: {e}")
                 with col_btn:
-                    if st.button("🗑️", key=f"del_cam_{idx}"):
-                        st.session_state.cameras.pop(idx)
+                    if st.button("🗑️", key=f"del_cam_{camera_key(camera)}"):
+                        camera_ingest.remove(camera_key(camera))
+                        camera_registry.remove(camera_key(camera))
+                        zone_registry.set(camera_key(camera), [])
                         st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -630,6 +805,11 @@ elif st.session_state.page == "Models":
     </div>
     """, unsafe_allow_html=True)
     
+    model_registry = load_model_registry()
+    pool = load_model_pool()
+    activation = pool.activation if pool is not None else None
+    loading = activation is not None and activation['state'] == 'loading'
+    
     col1, col2 = st.columns([1, 2], gap="large")
     
     with col1:
@@ -640,33 +820,156 @@ elif st.session_state.page == "Models":
         if uploaded_model:
             st.success(f"Model '{uploaded_model.name}' ready to upload")
             if st.button("Save Model", use_container_width=True):
-                st.session_state.models.append({
-                    'name': uploaded_model.name,
-                    'status': 'Inactive',
-                    'accuracy': 'N/A'
-                })
-                st.success("Model uploaded successfully!")
+                version = model_registry.add(uploaded_model.getvalue(), uploaded_model.name)
+                st.success(f"Model saved as version {version['id']}")
         
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
+        versions = model_registry.versions()
+        active_version = model_registry.active()
         st.markdown('<div class="panel-card">', unsafe_allow_html=True)
-        st.markdown(f'<div class="panel-header">🗂️ Available Models ({len(st.session_state.models)})</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="panel-header">🗂️ Available Models ({len(versions)})</div>', unsafe_allow_html=True)
         
-        for idx, model in enumerate(st.session_state.models):
-            status_class = "status-active" if model['status'] == 'Active' else "status-warning"
-            st.markdown(f"""
-            <div class="camera-card">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <h3 style="color: #ffffff; margin: 0;">🤖 {model['name']}</h3>
-                        <p style="color: #9ca3af; margin: 0.5rem 0;">
-                            Accuracy: {model['accuracy']} | Status: <span class="status-chip {status_class}">{model['status']}</span>
-                        </p>
+        if loading:
+            st.info("⏳ Loading and warming up the new model; detection continues on the current one")
+        elif activation is not None and activation['state'] == 'failed':
+            st.error(f"Model activation failed: {activation['error']}")
+        elif activation is not None and activation['state'] == 'ready':
+            st.success("The new model is serving detections")
+        
+        if not versions:
+            st.info("No models yet. Upload a .pt file to create the first version.")
+        
+        for version in versions:
+            is_active = active_version is not None and version['id'] == active_version['id']
+            is_loading = loading and activation['weights'] == model_registry.path(version)
+            if is_active:
+                status, status_class = 'Active', 'status-active'
+            elif is_loading:
+                status, status_class = 'Loading', 'status-warning'
+            else:
+                status, status_class = 'Inactive', 'status-warning'
+            col_info, col_btn = st.columns([4, 1])
+            with col_info:
+                st.markdown(f"""
+                <div class="camera-card">
+                    <div style="display: flex; justify-content: space-between; align-items: center;">
+                        <div>
+                            <h3 style="color: #ffffff; margin: 0;">🤖 {version['name']}</h3>
+                            <p style="color: #9ca3af; margin: 0.5rem 0;">
+                                Version: {version['id']} | {version['size'] / (1024 * 1024):.1f} MB | Status: <span class="status-chip {status_class}">{status}</span>
+                            </p>
+                        </div>
                     </div>
                 </div>
-            </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
+            with col_btn:
+                if not is_active:
+                    if st.button("Activate", key=f"activate_{version['id']}", disabled=loading, use_container_width=True):
+                        if activate_model_version(version['id']):
+                            st.rerun()
+                        else:
+                            st.warning("Another model is still loading")
+                    if st.button("🗑️", key=f"delete_{version['id']}", disabled=is_loading):
+                        model_registry.delete(version['id'])
+                        st.rerun()
+        
+        if loading and st.button("🔄 Refresh Status"):
+            st.rerun()
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Inference backend
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">⚙️ Inference Backend</div>', unsafe_allow_html=True)
+    
+    if pool is None:
+        st.info("Upload a model or add best.pt to the project directory to choose an inference backend.")
+    else:
+        backend_col, parity_col = st.columns(2, gap="large")
+        
+        with backend_col:
+            backend = st.selectbox(
+                "Backend", BACKENDS, index=BACKENDS.index(pool.backend), format_func=BACKEND_LABELS.get,
+                help="ONNX Runtime and OpenVINO run a graph exported once from the active weights and cached by their checksum"
+            )
+            st.caption(f"Active: {BACKEND_LABELS[pool.backend]} · {pool.size} instances · warmed up in {pool.warmup['seconds']:.1f}s"
+                       + (" · warming up the new image or batch size" if pool.warming else ""))
+            if st.button("Activate Backend", use_container_width=True, disabled=backend == pool.backend or pool.activating):
+                with st.spinner(f"Exporting and loading {BACKEND_LABELS[backend]}..."):
+                    try:
+                        pool.use_backend(backend)
+                        save_backend_choice(BACKEND_PATH, backend)
+                        st.success(f"✅ {BACKEND_LABELS[backend]} is now serving detections")
+                    except Exception as e:
+                        st.error(f"Could not load {BACKEND_LABELS[backend]}: {e}")
+        
+        with parity_col:
+            parity_image = st.file_uploader("Parity Check Image", type=['jpg', 'jpeg', 'png'], key="parity_image")
+            if parity_image and st.button("🔬 Compare with PyTorch", use_container_width=True):
+                with st.spinner("Running both backends..."):
+                    parity = check_parity(pool.weights, pool, Image.open(parity_image))
+                parity_cols = st.columns(3)
+                parity_cols[0].metric("Matched Boxes", f"{parity['matched']}/{parity['reference']}")
+                parity_cols[1].metric("Max Box Error", f"{parity['max_box_error']:.1f}px")
+                parity_cols[2].metric("Max Conf. Diff", f"{parity['max_conf_diff']:.3f}")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # INT8 quantization
+    if pool is not None:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+        st.markdown('<div class="panel-header">🧪 INT8 Quantization</div>', unsafe_allow_html=True)
+        
+        calib_col, eval_col = st.columns(2)
+        with calib_col:
+            calibration_dir = st.text_input(
+                "Calibration Images Folder", placeholder="e.g. data/calibration",
+                help="A few hundred representative frames from your cameras"
+            )
+        with eval_col:
+            eval_dir = st.text_input(
+                "Labeled Evaluation Set (Optional)", placeholder="e.g. data/val",
+                help="YOLO-format images/ and labels/ folders; without it only latency is compared"
+            )
+        
+        if st.button("🧪 Quantize and Compare", use_container_width=True, disabled=not calibration_dir):
+            with st.spinner("Calibrating, quantizing and evaluating FP32 vs INT8..."):
+                try:
+                    st.session_state.int8_report = quantize_and_compare(
+                        pool.weights, pool.artifact_dir, pool.weights_checksum, calibration_dir, eval_dir or None
+                    )
+                except Exception as e:
+                    st.error(f"Quantization failed: {e}")
+        
+        int8_report = st.session_state.get('int8_report')
+        if int8_report:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Model': name,
+                    'mAP@0.5': f"{report['map50']:.3f}" if report['map50'] is not None else 'N/A',
+                    'mAP@0.5:0.95': f"{report['map50_95']:.3f}" if report['map50_95'] is not None else 'N/A',
+                    'Latency (ms/image)': f"{report['latency_ms']:.1f}",
+                    'Size (MB)': f"{report['size_mb']:.1f}"
+                }
+                for name, report in (('FP32', int8_report['fp32']), ('INT8', int8_report['int8']))
+            ]), use_container_width=True, hide_index=True)
+            speedup = int8_report['fp32']['latency_ms'] / max(int8_report['int8']['latency_ms'], 1e-6)
+            st.caption(
+                f"Calibrated on {int8_report['calibration_images']} images · "
+                f"INT8 is {speedup:.2f}x the FP32 speed on {int8_report['int8']['images']} images"
+            )
+            if pool.backend != INT8_BACKEND and st.button("Activate INT8 Model", use_container_width=True, disabled=pool.activating):
+                with st.spinner("Loading the INT8 model..."):
+                    try:
+                        pool.use_backend(INT8_BACKEND)
+                        save_backend_choice(BACKEND_PATH, INT8_BACKEND)
+                        st.success("✅ The INT8 model is now serving detections")
+                    except Exception as e:
+                        st.error(f"Could not load the INT8 model: {e}")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -678,12 +981,15 @@ elif st.session_state.page == "Upload/Test":
     </div>
     """, unsafe_allow_html=True)
     
-    model = load_yolo_model()
+    model = load_model_pool()
     
     if model is None:
         st.error("⚠️ Model 'best.pt' not found. Please add your model file to the project directory.")
+        if model_load_error() is not None:
+            st.error(f"Error loading model: {model_load_error()}")
     else:
         st.success("✅ Model loaded successfully")
+        inference_options = load_inference_config().predict_kwargs(model.names)
         
         input_type = st.radio("Select Input Type", ["📷 Image", "🎥 Video"], horizontal=True)
         
@@ -700,10 +1006,18 @@ elif st.session_state.page == "Upload/Test":
                     st.markdown("#### 🖼️ Original Image")
                     st.image(image, use_container_width=True)
                 
+                tiled = st.checkbox(
+                    "🧩 Tiled inference",
+                    help="Detect on overlapping tiles at full resolution; finds small objects in large images"
+                )
+                
                 if st.button("🚀 Run Detection", use_container_width=True):
                     with st.spinner("🔍 Analyzing..."):
                         start_time = time.time()
-                        results = model.predict(image, conf=0.25)
+                        results = load_detection_cache().predict(
+                            TiledModel(model, tile_size=inference_options['imgsz']) if tiled else model,
+                            image, uploaded_file.getvalue(), **inference_options
+                        )
                         processing_time = time.time() - start_time
                         
                         with col2:
@@ -712,15 +1026,8 @@ elif st.session_state.page == "Upload/Test":
                             st.image(annotated, use_container_width=True)
                         
                         # Add to detections
-                        if len(results[0].boxes) > 0:
-                            for box in results[0].boxes:
-                                cls_id = int(box.cls[0])
-                                conf = float(box.conf[0])
-                                st.session_state.detections.append({
-                                    'class': results[0].names[cls_id],
-                                    'confidence': conf,
-                                    'time': datetime.now().strftime("%H:%M:%S")
-                                })
+                        load_detection_buffer().append_result('upload', results[0])
+                        load_detection_store().add_result('upload', results[0])
                         
                         # Metrics
                         st.markdown("---")
@@ -740,12 +1047,49 @@ elif st.session_state.page == "Upload/Test":
             st.markdown('<div class="panel-card">', unsafe_allow_html=True)
             uploaded_video = st.file_uploader("Upload Video", type=['mp4', 'avi', 'mov'])
             
+            video_jobs = load_video_jobs()
+            
             if uploaded_video:
                 st.video(uploaded_video)
                 
                 if st.button("🚀 Process Video", use_container_width=True):
-                    with st.spinner("🎬 Processing video..."):
-                        st.info("Video processing feature ready. Processing may take several minutes.")
+                    # Hand the upload to the background workers; only the id lives in the session
+                    job_id = video_jobs.submit(uploaded_video.getvalue(), uploaded_video.name, **inference_options)
+                    st.session_state.video_jobs.append(job_id)
+                    st.success(f"✅ Job {job_id} queued. Processing continues in the background.")
+            
+            session_jobs = [video_jobs.get(job_id) for job_id in st.session_state.video_jobs]
+            session_jobs = [job for job in session_jobs if job is not None]
+            
+            if session_jobs:
+                st.markdown("#### 🎬 Video Jobs")
+                for job in reversed(session_jobs):
+                    st.markdown(f"**{job.filename}** · `{job.id}` · {job.status.title()}")
+                    if job.status == 'failed':
+                        st.error(f"⚠️ Processing failed: {job.error}")
+                    elif job.status == 'done':
+                        summary = job.summary
+                        st.caption(
+                            f"{summary['frames']} frames · {summary['detections']} detections · "
+                            f"{summary['elapsed']:.1f}s ({summary['fps']:.1f} FPS) · "
+                            f"inferred {summary['inferred_frames']}, reused {summary['reused_frames']}"
+                        )
+                        with open(job.output_path, 'rb') as f:
+                            st.download_button(
+                                label="⬇️ Download Processed Video",
+                                data=f.read(),
+                                file_name=f"processed_{job.id}.mp4",
+                                mime="video/mp4",
+                                key=f"download_{job.id}",
+                                use_container_width=True
+                            )
+                    else:
+                        st.progress(job.progress, text=f"{job.frames_done}/{job.total_frames or '?'} frames")
+                
+                if any(not job.finished for job in session_jobs):
+                    if st.checkbox("Auto-refresh progress", value=True):
+                        time.sleep(1)
+                        st.rerun()
             
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -768,8 +1112,37 @@ elif st.session_state.page == "Analytics":
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Generate data
-    hours, queue_lengths, wait_times = generate_queue_data()
+    # Archived history for the selected range
+    if len(date_range) == 2:
+        range_start, range_end = date_range[0], date_range[1] + timedelta(days=1)
+    else:
+        range_start, range_end = date_range[0], date_range[0] + timedelta(days=1)
+    daily_counts = load_detection_archive().daily_counts(range_start, range_end)
+    
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">🗃️ Detections per Day</div>', unsafe_allow_html=True)
+    if daily_counts:
+        fig = go.Figure(data=[go.Bar(
+            x=list(daily_counts.keys()),
+            y=list(daily_counts.values()),
+            marker_color='#6366f1'
+        )])
+        fig.update_layout(
+            xaxis_title="Date",
+            yaxis_title="Detections",
+            template="plotly_dark",
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#e0e0e0'),
+            height=300
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No archived detections in this range yet. History is archived every few minutes.")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Hour-of-day profiles for the selected range, from the rollup tables
+    hours, queue_lengths, wait_times, heatmap_data = get_range_data(range_start, range_end)
     
     # Charts
     col_chart1, col_chart2 = st.columns(2, gap="large")
@@ -803,17 +1176,41 @@ elif st.session_state.page == "Analytics":
         st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # Zone occupancy
+    zone_metrics = load_queue_metrics().metrics('zone:')
+    if zone_metrics:
+        st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+        st.markdown('<div class="panel-header">🧭 Zone Occupancy (24 Hours)</div>', unsafe_allow_html=True)
+        
+        fig = go.Figure()
+        for metric in zone_metrics:
+            zone_starts, zone_values, _ = load_queue_metrics().series(metric, '1h', 24)
+            fig.add_trace(go.Scatter(
+                x=[datetime.fromtimestamp(ts).strftime('%H:00') for ts in zone_starts],
+                y=zone_values,
+                mode='lines+markers',
+                name=metric[len('zone:'):]
+            ))
+        fig.update_layout(
+            xaxis_title="Hour",
+            yaxis_title="People in Zone",
+            template="plotly_dark",
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#e0e0e0'),
+            height=350
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
     # Heatmap
     st.markdown('<div class="panel-card">', unsafe_allow_html=True)
     st.markdown('<div class="panel-header">🔥 Activity Heatmap</div>', unsafe_allow_html=True)
     
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    heatmap_data = np.random.randint(5, 25, size=(7, 24))
-    
     fig = go.Figure(data=go.Heatmap(
         z=heatmap_data,
-        x=hours,
-        y=days,
+        x=list(range(24)),
+        y=DAYS,
         colorscale='Viridis',
         colorbar=dict(title="Queue Length")
     ))
@@ -880,17 +1277,23 @@ elif st.session_state.page == "Monitoring":
         """, unsafe_allow_html=True)
     
     with col3:
+        live_cameras = sum(
+            1 for camera in cameras
+            if (camera_ingest.stats(camera_key(camera)) or {}).get('status') == 'live'
+        )
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        detections_today = load_detection_store().count(since=midnight.timestamp())
         st.markdown(f"""
         <div class="panel-card">
             <div class="panel-header">📊 Statistics</div>
             <div style="margin-top: 1.5rem;">
                 <div style="margin: 1rem 0;">
-                    <p style="color: #9ca3af; margin: 0;">Active Cameras</p>
-                    <h2 style="color: #ffffff; margin: 0.5rem 0;">{len(st.session_state.cameras)}</h2>
+                    <p style="color: #9ca3af; margin: 0;">Live Cameras</p>
+                    <h2 style="color: #ffffff; margin: 0.5rem 0;">{live_cameras} / {len(cameras)}</h2>
                 </div>
                 <div style="margin: 1.5rem 0;">
                     <p style="color: #9ca3af; margin: 0;">Total Detections Today</p>
-                    <h2 style="color: #ffffff; margin: 0.5rem 0;">{len(st.session_state.detections)}</h2>
+                    <h2 style="color: #ffffff; margin: 0.5rem 0;">{detections_today}</h2>
                 </div>
                 <div style="margin: 1.5rem 0;">
                     <p style="color: #9ca3af; margin: 0;">Uptime</p>
@@ -900,23 +1303,157 @@ elif st.session_state.page == "Monitoring":
         </div>
         """, unsafe_allow_html=True)
     
+    # Inference cache
+    cache_stats = load_detection_cache().summary()
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">🧠 Inference Cache</div>', unsafe_allow_html=True)
+    
+    cache_cols = st.columns(4)
+    cache_cols[0].metric("Cache Hits", cache_stats['hits'], f"{cache_stats['disk_hits']} from disk", delta_color="off")
+    cache_cols[1].metric("Cache Misses", cache_stats['misses'])
+    cache_cols[2].metric("Hit Rate", f"{cache_stats['hit_rate']:.1%}")
+    cache_cols[3].metric(
+        "Disk Tier",
+        f"{cache_stats['disk_bytes'] / (1024 * 1024):.1f} MB",
+        f"{cache_stats['disk_entries']} entries",
+        delta_color="off"
+    )
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Detection store
+    store_stats = load_detection_store().summary()
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">🗄️ Detection Store</div>', unsafe_allow_html=True)
+    
+    store_cols = st.columns(4)
+    store_cols[0].metric("Rows Written", store_stats['rows_written'])
+    store_cols[1].metric("Write Batches", store_stats['batches'])
+    store_cols[2].metric("Avg Rows / Batch", f"{store_stats['avg_batch']:.1f}")
+    store_cols[3].metric("Pending Writes", store_stats['pending'])
+    if store_stats['last_error']:
+        st.error(f"Last write error: {store_stats['last_error']}")
+    
+    archive_stats = load_detection_archive().summary()
+    archive_cols = st.columns(4)
+    archive_cols[0].metric("Archive Partitions", archive_stats['partitions'])
+    archive_cols[1].metric("Archive Files", archive_stats['files'])
+    archive_cols[2].metric("Archive Size", f"{archive_stats['bytes'] / (1024 * 1024):.1f} MB")
+    archive_cols[3].metric(
+        "Last Archive Roll",
+        datetime.fromtimestamp(archive_stats['last_roll']).strftime("%H:%M:%S") if archive_stats['last_roll'] else "Pending"
+    )
+    if archive_stats['last_error']:
+        st.error(f"Last archive error: {archive_stats['last_error']}")
+    
+    class_rows = load_detection_buffer().class_stats(since=time.time() - 3600)
+    if class_rows:
+        st.markdown("**Detections by class (last hour)**")
+        st.dataframe(
+            [{'Class': row['class'], 'Count': row['count'], 'Avg Confidence': f"{row['avg_conf']:.1%}"} for row in class_rows],
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Person tracking
+    tracking_stats = load_queue_tracker().stats()
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">🧍 Person Tracking</div>', unsafe_allow_html=True)
+    
+    track_cols = st.columns(4)
+    track_cols[0].metric("Tracked Sources", tracking_stats['cameras'])
+    track_cols[1].metric("Open Tracks", tracking_stats['tracks'])
+    track_cols[2].metric("People Tracked", tracking_stats['people_tracked'])
+    track_cols[3].metric("Wait Times Measured", tracking_stats['waits_recorded'])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Detection scheduler
+    if camera_scheduler is not None:
+        scheduler_stats = camera_scheduler.stats()
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+        st.markdown('<div class="panel-header">🗓️ Detection Scheduler</div>', unsafe_allow_html=True)
+        
+        sched_cols = st.columns(3)
+        sched_cols[0].metric("Queue Depth", scheduler_stats['queue_depth'])
+        sched_cols[1].metric("Batches Run", scheduler_stats['batches'])
+        sched_cols[2].metric("Avg Batch Size", f"{scheduler_stats['avg_batch']:.1f}")
+        
+        roi_stats = scheduler_stats['roi']
+        if roi_stats['frames']:
+            roi_cols = st.columns(3)
+            roi_cols[0].metric("ROI Pixel Reduction", f"{roi_stats['pixel_reduction']:.0%}")
+            roi_cols[1].metric("Model Input Reduction", f"{roi_stats['input_reduction']:.0%}")
+            roi_cols[2].metric(
+                "Est. Latency Saved",
+                f"{roi_stats['latency_saved_ms']:.1f} ms/frame",
+                help="Estimated from the measured ROI latency scaled by the full-frame input size"
+            )
+        
+        names = {camera_key(camera): camera['name'] for camera in cameras}
+        rows = [
+            {
+                'Camera': names.get(camera_id, camera_id),
+                'Target Hz': f"{cam['target_hz']:.1f}",
+                'Achieved Hz': f"{cam['achieved_hz']:.2f}",
+                'Skipped (unchanged)': cam['skipped_unchanged'],
+                'Record Errors': cam['record_errors'],
+                'Last Detections': cam['detections'],
+                'ROI Pixels Saved': f"{cam['roi']['pixel_reduction']:.0%}" if cam['roi'] else '—',
+                'Tiled': '✓' if cam['tiled'] else ''
+            }
+            for camera_id, cam in scheduler_stats['cameras'].items()
+            if camera_id in names
+        ]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        for camera_id, cam in scheduler_stats['cameras'].items():
+            if camera_id in names and cam['last_error']:
+                st.warning(f"Recording detections for {names[camera_id]} failed: {cam['last_error']}")
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Import timings
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<div class="panel-card">', unsafe_allow_html=True)
+    st.markdown('<div class="panel-header">⏱️ Import Timings</div>', unsafe_allow_html=True)
+    st.dataframe(import_report(), use_container_width=True, hide_index=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
     # Camera status
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown('<div class="panel-card">', unsafe_allow_html=True)
     st.markdown('<div class="panel-header">📹 Camera Status</div>', unsafe_allow_html=True)
     
-    if len(st.session_state.cameras) > 0:
+    if len(cameras) > 0:
         cam_cols = st.columns(3)
-        for idx, camera in enumerate(st.session_state.cameras):
+        for idx, camera in enumerate(cameras):
+            stats = camera_ingest.stats(camera_key(camera))
+            if stats and stats['lag_s'] is not None:
+                last_sync = datetime.fromtimestamp(time.time() - stats['lag_s']).strftime("%H:%M:%S")
+                ingest_text = (
+                    f"⚡ {stats['fps']:.1f} FPS · lag {stats['lag_s']:.2f}s<br>"
+                    f"🗑️ {stats['dropped']} dropped · 🔁 {stats['reconnects']} reconnects"
+                )
+            else:
+                last_sync = "never"
+                ingest_text = stats['error'] if stats and stats['error'] else "No stream configured"
             with cam_cols[idx % 3]:
                 st.markdown(f"""
                 <div class="camera-card">
                     <h4 style="color: #ffffff; margin-top: 0;">📷 {camera['name']}</h4>
                     <p style="color: #9ca3af; margin: 0.5rem 0;">
                         📍 {camera['location']}<br>
-                        🕐 Last sync: {datetime.now().strftime("%H:%M:%S")}
+                        🕐 Last sync: {last_sync}<br>
+                        {ingest_text}
                     </p>
-                    <span class="status-chip status-success">● Live</span>
+                    {camera_status_chip(stats)}
                 </div>
                 """, unsafe_allow_html=True)
     else:
@@ -956,8 +1493,26 @@ elif st.session_state.page == "Settings":
         st.markdown('<div class="panel-card">', unsafe_allow_html=True)
         st.markdown('<div class="panel-header">🤖 Detection Settings</div>', unsafe_allow_html=True)
         
-        st.slider("Confidence Threshold", 0.0, 1.0, 0.25, 0.05)
-        st.slider("IOU Threshold", 0.0, 1.0, 0.45, 0.05)
+        inference_config = load_inference_config()
+        config = inference_config.get()
+        conf = st.slider("Confidence Threshold", 0.0, 1.0, config['conf'], 0.05)
+        iou = st.slider("IOU Threshold", 0.0, 1.0, config['iou'], 0.05)
+        img_size = st.selectbox(
+            "Image Size", IMGSZ_CHOICES,
+            index=IMGSZ_CHOICES.index(config['imgsz']) if config['imgsz'] in IMGSZ_CHOICES else IMGSZ_CHOICES.index(640),
+            help="Smaller inputs are faster but miss small or distant people"
+        )
+        max_det = st.number_input("Maximum Detections", min_value=1, max_value=1000, value=min(config['max_det'], 1000))
+        classes_text = st.text_input(
+            "Detect Classes", value=', '.join(config['classes']), placeholder="e.g. person",
+            help="Comma-separated class names; leave blank to detect every class"
+        )
+        batch_size = st.number_input(
+            "Batch Size", min_value=1, max_value=64, value=config['batch_size'],
+            help="Frames per forward pass for cameras and videos"
+        )
+        half = st.checkbox("FP16 (GPU only)", value=config['half'])
+        st.caption("INT8 runs as the ONNX Runtime INT8 backend; quantize and activate it on the Models page.")
         st.number_input("Max Queue Alert", min_value=5, max_value=50, value=15)
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -969,7 +1524,14 @@ elif st.session_state.page == "Settings":
         st.text_input("Webhook URL", placeholder="https://...")
         
         if st.button("💾 Save Settings", use_container_width=True):
-            st.success("✅ Settings saved successfully!")
+            try:
+                inference_config.update(
+                    conf=conf, iou=iou, imgsz=img_size, max_det=max_det,
+                    classes=classes_text.split(','), half=half, batch_size=batch_size
+                )
+                st.success("✅ Settings saved successfully!")
+            except ValueError as e:
+                st.error(f"Invalid settings: {e}")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
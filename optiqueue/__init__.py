@@ -0,0 +1 @@
+"""Shared runtime components for the OptiQueue dashboards."""
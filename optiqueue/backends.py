@@ -0,0 +1,138 @@
+"""Pluggable CPU inference backends for the YOLO weights.
+
+``pytorch`` runs the ``.pt`` weights eagerly. ``onnx`` (ONNX Runtime) and
+``openvino`` run a graph exported once from the same weights and cached
+under ``<artifact dir>/<weights checksum>/``, so a re-export only happens
+when the weights change. Exports have dynamic batch and image sizes, so
+batching, ROI crops and tiles work unchanged. ``onnx-int8`` runs the
+quantized graph that ``optiqueue.quantization`` stores beside the export.
+
+Exported graphs are loaded through ultralytics, which keeps letterboxing
+and NMS identical to the PyTorch path. ONNX Runtime sessions are then
+recreated with every graph optimization enabled and a per-instance thread
+budget, so pooled instances do not oversubscribe the CPU.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from optiqueue.lazy_imports import ort, ultralytics
+from optiqueue.tracking import box_iou, greedy_match
+
+INT8_BACKEND = 'onnx-int8'
+BACKENDS = ('pytorch', 'onnx', 'openvino', INT8_BACKEND)
+BACKEND_LABELS = {
+    'pytorch': 'PyTorch (eager)',
+    'onnx': 'ONNX Runtime',
+    'openvino': 'OpenVINO',
+    INT8_BACKEND: 'ONNX Runtime INT8',
+}
+EXPORT_SUFFIX = {'onnx': '.onnx', 'openvino': '_openvino_model', INT8_BACKEND: '_int8.onnx'}
+
+
+def export_path(weights, backend, artifact_dir, checksum):
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(artifact_dir, checksum[:16], stem + EXPORT_SUFFIX[backend])
+
+
+def export_model(weights, backend, artifact_dir, checksum, imgsz=640):
+    """Export ``weights`` for ``backend`` unless cached; returns the artifact path"""
+    target = export_path(weights, backend, artifact_dir, checksum)
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    work = tempfile.mkdtemp(dir=os.path.dirname(target))
+    try:
+        # ultralytics writes the export next to the weights, so export a private copy
+        copy = os.path.join(work, os.path.basename(weights))
+        shutil.copyfile(weights, copy)
+        exported = ultralytics.YOLO(copy).export(format=backend, dynamic=True, imgsz=imgsz)
+        os.replace(exported, target)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return target
+
+
+def tune_onnx_session(model, path, threads):
+    """Recreate a warmed-up model's ONNX Runtime session with full optimization; False if not ONNX"""
+    autobackend = getattr(model.predictor, 'model', None)
+    # ultralytics >= 8.4 keeps the session on a per-format backend object;
+    # older releases keep it on the AutoBackend itself
+    backend = getattr(autobackend, 'backend', None)
+    if getattr(backend, 'session', None) is None:
+        backend = autobackend
+    if getattr(backend, 'session', None) is None:
+        return False
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = max(1, int(threads))
+    options.inter_op_num_threads = 1
+    backend.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+    return True
+
+
+def load_model(weights, backend, artifact_dir, checksum, imgsz=640):
+    """``ultralytics.YOLO`` running ``weights`` on ``backend``, plus the file it loaded"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'; expected one of {', '.join(BACKENDS)}")
+    if backend == 'pytorch':
+        path = weights
+    elif backend == INT8_BACKEND:
+        path = export_path(weights, backend, artifact_dir, checksum)
+        if not os.path.exists(path):
+            raise FileNotFoundError("No INT8 model for these weights yet; run the quantization first")
+    else:
+        path = export_model(weights, backend, artifact_dir, checksum, imgsz)
+    return ultralytics.YOLO(path, task='detect'), path
+
+
+def load_backend_choice(path, default='pytorch'):
+    try:
+        with open(path) as f:
+            backend = json.load(f).get('backend', default)
+    except (OSError, ValueError):
+        return default
+    return backend if backend in BACKENDS else default
+
+
+def save_backend_choice(path, backend):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'backend': backend}, f)
+    os.replace(tmp, path)
+
+
+def compare_results(reference, candidate, iou_threshold=0.5):
+    """Match ``candidate`` boxes to ``reference`` boxes of the same class.
+
+    Returns the match rate against both sides plus the worst corner offset
+    (pixels) and confidence difference among matched boxes.
+    """
+    ref = reference.boxes.data.cpu().numpy()
+    cand = candidate.boxes.data.cpu().numpy()
+    iou = box_iou(ref[:, :4], cand[:, :4])
+    iou[ref[:, None, 5] != cand[None, :, 5]] = 0.0
+    pairs, _, _ = greedy_match(iou, iou_threshold)
+    rows = np.array([row for row, _ in pairs], dtype=np.int64)
+    cols = np.array([col for _, col in pairs], dtype=np.int64)
+    return {
+        'reference': len(ref),
+        'candidate': len(cand),
+        'matched': len(pairs),
+        'recall': len(pairs) / len(ref) if len(ref) else 1.0,
+        'precision': len(pairs) / len(cand) if len(cand) else 1.0,
+        'max_box_error': float(np.abs(ref[rows, :4] - cand[cols, :4]).max()) if len(pairs) else 0.0,
+        'max_conf_diff': float(np.abs(ref[rows, 4] - cand[cols, 4]).max()) if len(pairs) else 0.0,
+    }
+
+
+def check_parity(weights, model, source, conf=0.25):
+    """Compare ``model``'s detections on ``source`` against the eager PyTorch weights"""
+    reference = ultralytics.YOLO(weights).predict(source, conf=conf, verbose=False)[0]
+    candidate = model.predict(source, conf=conf)[0]
+    return compare_results(reference, candidate)
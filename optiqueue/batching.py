@@ -0,0 +1,131 @@
+"""Deadline-based micro-batching of inference requests.
+
+Callers submit single frames and get a ``Future`` back. Worker threads group
+pending frames that share the same predict parameters into batches of up to
+``batch_size`` frames, waiting at most ``max_wait`` seconds for a batch to
+fill, run each batch as one forward pass and scatter the results back. With
+a shared ``InferenceConfig`` the batch size follows its saved value.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Group:
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.items = []
+
+
+class InferenceBatcher:
+    """Batches ``predict`` calls from many callers into single forward passes.
+
+    It exposes the same ``predict``/``names``/``checksum`` surface as
+    ``ModelPool`` so it can be used wherever a model is expected.
+    """
+
+    def __init__(self, model, batch_size=8, max_wait=0.02, workers=None, config=None):
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.config = config
+        self.max_wait = max(0.0, float(max_wait))
+        self._groups = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {'batches': 0, 'frames': 0, 'busy': 0.0}
+
+        workers = workers or getattr(model, 'size', 1)
+        self._workers = [
+            threading.Thread(target=self._run, name=f"batcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def task(self):
+        return self.model.task
+
+    @property
+    def checksum(self):
+        return self.model.checksum
+
+    def submit(self, source, **kwargs):
+        """Queue one image/frame; the future resolves to its ``Results``"""
+        future = Future()
+        key = repr(sorted(kwargs.items()))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("InferenceBatcher is closed")
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(kwargs)
+            group.items.append((source, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def predict(self, source, **kwargs):
+        """Blocking ``model.predict`` equivalent that goes through the batcher"""
+        kwargs.pop('verbose', None)
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        futures = [self.submit(item, **kwargs) for item in sources]
+        return [future.result() for future in futures]
+
+    def summary(self):
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'avg_batch': self.stats['frames'] / batches if batches else 0.0,
+            'fps': self.stats['frames'] / self.stats['busy'] if self.stats['busy'] > 0 else 0.0,
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                next_deadline = None
+                batch_size = self.config['batch_size'] if self.config is not None else self.batch_size
+                for key, group in self._groups.items():
+                    deadline = group.items[0][2] + self.max_wait
+                    if len(group.items) >= batch_size or deadline <= now or self._closed:
+                        batch = group.items[:batch_size]
+                        del group.items[:batch_size]
+                        if not group.items:
+                            del self._groups[key]
+                        return group.kwargs, batch
+                    if next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                if self._closed:
+                    return None, None
+                self._cond.wait(None if next_deadline is None else next_deadline - now)
+
+    def _run(self):
+        while True:
+            kwargs, batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            try:
+                results = self.model.predict([source for source, _, _ in batch], **kwargs)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(batch)
+                self.stats['busy'] += elapsed
+            for (_, future, _), result in zip(batch, results):
+                # Share of the batch's forward pass attributed to this frame
+                result.batch_seconds = elapsed / len(batch)
+                future.set_result(result)
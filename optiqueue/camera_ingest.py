@@ -0,0 +1,209 @@
+"""Background ingest of camera streams into latest-frame buffers.
+
+Each camera gets one reader thread that keeps only the newest decoded frame
+in a single-slot buffer; frames nobody consumed before the next one arrives
+are counted as dropped. Readers reconnect with exponential backoff.
+
+Local video files (or ``file://`` URLs) are accepted as fake RTSP sources:
+they are paced at their native frame rate and looped, which makes the whole
+ingest path testable without real cameras.
+"""
+import os
+import threading
+import time
+
+from optiqueue.lazy_imports import cv2
+
+
+def camera_key(camera):
+    """Stable id of a camera entry from the camera registry"""
+    return camera.get('id') or camera['name']
+
+
+class LatestFrameBuffer:
+    """Single-slot buffer that always holds the newest frame"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self.dropped = 0
+
+    def put(self, frame, timestamp):
+        with self._lock:
+            if self._seq > self._consumed_seq:
+                self.dropped += 1
+            self._frame = frame
+            self._timestamp = timestamp
+            self._seq += 1
+
+    def get(self):
+        """Return ``(seq, timestamp, frame)`` of the newest frame and mark it consumed"""
+        with self._lock:
+            self._consumed_seq = self._seq
+            return self._seq, self._timestamp, self._frame
+
+    def peek(self):
+        """Like ``get`` but leaves the frame unconsumed (for previews)"""
+        with self._lock:
+            return self._seq, self._timestamp, self._frame
+
+    @property
+    def seq(self):
+        return self._seq
+
+
+class CameraReader(threading.Thread):
+    """Reads one stream into a ``LatestFrameBuffer``, reconnecting on failure"""
+
+    def __init__(self, camera_id, url, backoff_initial=1.0, backoff_max=30.0):
+        super().__init__(name=f"camera-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.url = url
+        self.buffer = LatestFrameBuffer()
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.status = 'connecting'
+        self.last_error = None
+        self.frames_read = 0
+        self.reconnects = 0
+        self.fps = 0.0
+        self.last_frame_time = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_file_source(self):
+        return self.url.startswith('file://') or os.path.isfile(self.url)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        now = time.time()
+        return {
+            'camera': self.camera_id,
+            'status': self.status,
+            'fps': self.fps,
+            'lag_s': now - self.last_frame_time if self.last_frame_time else None,
+            'frames': self.frames_read,
+            'dropped': self.buffer.dropped,
+            'reconnects': self.reconnects,
+            'error': self.last_error,
+        }
+
+    def run(self):
+        backoff = self.backoff_initial
+        source = self.url[len('file://'):] if self.url.startswith('file://') else self.url
+        while not self._stop_event.is_set():
+            cap = cv2.VideoCapture(source)
+            if not cap.isOpened():
+                cap.release()
+                self.status = 'reconnecting'
+                self.last_error = f"Cannot open {self.url}"
+                self.reconnects += 1
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            self.status = 'live'
+            self.last_error = None
+            backoff = self.backoff_initial
+            self._read_loop(cap)
+            cap.release()
+
+            if not self._stop_event.is_set():
+                self.status = 'reconnecting'
+                self.reconnects += 1
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+        self.status = 'stopped'
+
+    def _read_loop(self, cap):
+        # File sources are paced to their native frame rate and looped
+        pace = 0.0
+        if self.is_file_source:
+            native_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            pace = 1.0 / native_fps
+        next_due = time.monotonic()
+
+        while not self._stop_event.is_set():
+            ok, frame = cap.read()
+            if not ok:
+                if self.is_file_source and self.frames_read > 0:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                self.last_error = "Stream ended"
+                return
+
+            now = time.time()
+            if self.last_frame_time is not None:
+                interval = now - self.last_frame_time
+                if interval > 0:
+                    self.fps = 0.9 * self.fps + 0.1 / interval if self.fps else 1.0 / interval
+            self.last_frame_time = now
+            self.frames_read += 1
+            self.buffer.put(frame, now)
+
+            if pace:
+                next_due += pace
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_due = time.monotonic()
+
+
+class CameraIngest:
+    """Registry of running camera readers shared by all sessions"""
+
+    def __init__(self, backoff_initial=1.0, backoff_max=30.0):
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._readers = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, camera_id, url):
+        """Start (or restart on URL change) the reader for a camera"""
+        if not url:
+            return None
+        with self._lock:
+            reader = self._readers.get(camera_id)
+            if reader is not None and reader.url == url and reader.is_alive():
+                return reader
+            if reader is not None:
+                reader.stop()
+            reader = CameraReader(camera_id, url, self.backoff_initial, self.backoff_max)
+            self._readers[camera_id] = reader
+            reader.start()
+            return reader
+
+    def sync(self, cameras):
+        """Run a reader for every configured camera with a URL and stop all others"""
+        wanted = {camera_key(camera) for camera in cameras if camera.get('url')}
+        for camera_id in set(self.readers()) - wanted:
+            self.remove(camera_id)
+        for camera in cameras:
+            self.ensure(camera_key(camera), camera.get('url'))
+
+    def remove(self, camera_id):
+        with self._lock:
+            reader = self._readers.pop(camera_id, None)
+        if reader is not None:
+            reader.stop()
+
+    def reader(self, camera_id):
+        with self._lock:
+            return self._readers.get(camera_id)
+
+    def readers(self):
+        with self._lock:
+            return dict(self._readers)
+
+    def stats(self, camera_id):
+        reader = self.reader(camera_id)
+        return reader.stats() if reader is not None else None
+
+    def all_stats(self):
+        return [reader.stats() for reader in self.readers().values()]
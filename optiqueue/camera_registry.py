@@ -0,0 +1,64 @@
+"""Persisted list of configured cameras, shared by every session.
+
+Camera readers, scheduled inference and recording are process-wide, so the
+list that drives them is too: it is stored as JSON under the data directory
+and read on every page run, so a camera added or removed in one browser
+session shows up in all of them and survives logouts and restarts.
+"""
+import json
+import os
+import threading
+
+
+class CameraRegistry:
+    """Configured cameras, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cameras = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                cameras = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [camera for camera in cameras if isinstance(camera, dict) and camera.get('id')]
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._cameras, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def cameras(self):
+        """Copies of every camera, in the order they were added"""
+        with self._lock:
+            return [dict(camera) for camera in self._cameras]
+
+    def get(self, camera_id):
+        with self._lock:
+            camera = next((camera for camera in self._cameras if camera['id'] == camera_id), None)
+        return dict(camera) if camera is not None else None
+
+    def add(self, camera):
+        with self._lock:
+            self._cameras.append(dict(camera))
+            self._save()
+
+    def update(self, camera_id, **fields):
+        """Change fields of a camera; raises KeyError for an unknown camera"""
+        with self._lock:
+            camera = next((camera for camera in self._cameras if camera['id'] == camera_id), None)
+            if camera is None:
+                raise KeyError(camera_id)
+            camera.update(fields)
+            self._save()
+        return dict(camera)
+
+    def remove(self, camera_id):
+        with self._lock:
+            self._cameras = [camera for camera in self._cameras if camera['id'] != camera_id]
+            self._save()
@@ -0,0 +1,267 @@
+"""Round-robin, batched detection across all ingested cameras.
+
+The scheduler repeatedly collects the cameras that are due for a detection
+(per-camera target rate) and have a new frame, takes the latest frame of up
+to ``batch_size`` of them and runs a single forward pass. Under overload the
+cameras that have waited longest since their last detection go first, so no
+camera starves. Cameras whose buffer has not produced a new frame since the
+last detection are skipped.
+
+Cameras with a region of interest only send their crop to the model, and
+tiled cameras send overlapping ``imgsz`` tiles; pieces letterboxed to the
+same input shape share a forward pass. With a shared ``InferenceConfig`` the
+thresholds, input size, class filter and batch size follow its saved values.
+"""
+import threading
+import time
+from collections import deque
+
+from optiqueue.roi import RoiStats, crop_frame, model_input_shape, restore_result
+from optiqueue.tiling import merge_results, tile_image
+
+
+class _CameraState:
+    def __init__(self, target_hz, imgsz):
+        self.target_hz = target_hz
+        self.roi_stats = RoiStats(imgsz)
+        self.next_due = 0.0
+        self.last_seq = 0
+        self.last_served = 0.0
+        self.served = deque(maxlen=20)
+        self.skipped_unchanged = 0
+        self.record_errors = 0
+        self.last_error = None
+        self.result = None
+        self.result_time = None
+
+    @property
+    def achieved_hz(self):
+        if len(self.served) < 2:
+            return 0.0
+        span = self.served[-1] - self.served[0]
+        return (len(self.served) - 1) / span if span > 0 else 0.0
+
+
+class CameraScheduler(threading.Thread):
+    """Background thread that batches camera frames into shared forward passes"""
+
+    def __init__(self, ingest, model, target_hz=2.0, batch_size=8, conf=0.25, iou=0.45, imgsz=640,
+                 on_result=None, config=None):
+        super().__init__(name='camera-scheduler', daemon=True)
+        self.ingest = ingest
+        self.model = model
+        self.default_target_hz = target_hz
+        self.batch_size = max(1, int(batch_size))
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.on_result = on_result
+        self.config = config
+        self.queue_depth = 0
+        self.batches = 0
+        self.frames = 0
+        self._states = {}
+        self._targets = {}
+        self._rois = {}
+        self._tiled = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def set_target(self, camera_id, target_hz):
+        """Override the detection rate of one camera"""
+        target_hz = float(target_hz) if target_hz else self.default_target_hz
+        with self._lock:
+            self._targets[camera_id] = target_hz
+            if camera_id in self._states:
+                self._states[camera_id].target_hz = target_hz
+
+    def set_roi(self, camera_id, roi):
+        """Crop (and downscale) one camera's frames before detection; None restores full frames"""
+        with self._lock:
+            if roi:
+                self._rois[camera_id] = roi
+            else:
+                self._rois.pop(camera_id, None)
+
+    def set_tiling(self, camera_id, enabled):
+        """Detect on overlapping ``imgsz`` tiles of one camera's frames"""
+        with self._lock:
+            if enabled:
+                self._tiled.add(camera_id)
+            else:
+                self._tiled.discard(camera_id)
+
+    def latest(self, camera_id):
+        """Most recent ``(Results, wall time)`` for a camera, or ``(None, None)``"""
+        with self._lock:
+            state = self._states.get(camera_id)
+            return (state.result, state.result_time) if state else (None, None)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _setting(self, name):
+        return self.config[name] if self.config is not None else getattr(self, name)
+
+    def _options(self):
+        """Predict options of the next batch, from the shared config when there is one"""
+        if self.config is None:
+            return {'conf': self.conf, 'iou': self.iou, 'imgsz': self.imgsz, 'max_det': 300}
+        return self.config.predict_kwargs(self.model.names)
+
+    def stats(self):
+        with self._lock:
+            cameras = {
+                camera_id: {
+                    'target_hz': state.target_hz,
+                    'achieved_hz': state.achieved_hz,
+                    'skipped_unchanged': state.skipped_unchanged,
+                    'record_errors': state.record_errors,
+                    'last_error': state.last_error,
+                    'detections': len(state.result.boxes) if state.result is not None else 0,
+                    'roi': state.roi_stats.summary() if camera_id in self._rois else None,
+                    'tiled': camera_id in self._tiled,
+                }
+                for camera_id, state in self._states.items()
+            }
+            roi_stats = RoiStats(self._setting('imgsz'))
+            for camera_id, state in self._states.items():
+                if camera_id in self._rois:
+                    roi_stats.merge(state.roi_stats)
+        return {
+            'queue_depth': self.queue_depth,
+            'batches': self.batches,
+            'avg_batch': self.frames / self.batches if self.batches else 0.0,
+            'roi': roi_stats.summary(),
+            'cameras': cameras,
+        }
+
+    def run(self):
+        while not self._stop_event.is_set():
+            batch, wait = self._collect_due()
+            if not batch:
+                self._stop_event.wait(wait)
+                continue
+            self._run_batch(batch)
+
+    def _collect_due(self):
+        now = time.monotonic()
+        readers = self.ingest.readers()
+        due = []
+        next_due = None
+        with self._lock:
+            for camera_id in list(self._states):
+                if camera_id not in readers:
+                    del self._states[camera_id]
+            for camera_id, reader in readers.items():
+                state = self._states.get(camera_id)
+                if state is None:
+                    target_hz = self._targets.get(camera_id, self.default_target_hz)
+                    state = self._states[camera_id] = _CameraState(target_hz, self._setting('imgsz'))
+                if state.next_due > now:
+                    next_due = state.next_due if next_due is None else min(next_due, state.next_due)
+                    continue
+                if reader.buffer.seq == state.last_seq:
+                    # Nothing new since the last detection; give up this slot
+                    state.skipped_unchanged += 1
+                    state.next_due = now + (1.0 / state.target_hz if state.target_hz > 0 else 0.01)
+                    continue
+                due.append((state.last_served, camera_id, reader, state))
+        self.queue_depth = len(due)
+        # Longest-waiting cameras first keeps the schedule fair under overload
+        due.sort(key=lambda item: item[0])
+        wait = 0.01 if next_due is None else min(max(next_due - now, 0.001), 0.05)
+        return due[:self._setting('batch_size')], wait
+
+    def _run_batch(self, batch):
+        options = self._options()
+        imgsz = options.pop('imgsz')
+        frames = []
+        transforms = []
+        pieces = []
+        taken = []
+        for _, camera_id, reader, state in batch:
+            seq, timestamp, frame = reader.buffer.get()
+            if frame is None:
+                continue
+            with self._lock:
+                roi = self._rois.get(camera_id)
+                tiled = camera_id in self._tiled
+            image, transform = crop_frame(frame, roi) if roi else (frame, None)
+            index = len(frames)
+            if tiled:
+                # Tile offsets are in crop pixels; fold them into the crop's transform
+                x0, y0, sx, sy = transform or (0, 0, 1.0, 1.0)
+                for tile, (tx, ty, _, _) in tile_image(image, imgsz):
+                    pieces.append((index, tile, (x0 + tx / sx, y0 + ty / sy, sx, sy), imgsz))
+            elif transform is not None:
+                # Crops are letterboxed to their own size, not upscaled
+                pieces.append((index, image, transform, model_input_shape(*image.shape[:2], imgsz)))
+            else:
+                pieces.append((index, image, None, imgsz))
+            frames.append(frame)
+            transforms.append((transform, tiled))
+            taken.append((camera_id, state, seq, timestamp))
+        if not frames:
+            return
+
+        groups = {}
+        for piece in pieces:
+            groups.setdefault(piece[3], []).append(piece)
+        outputs = [[] for _ in frames]
+        failed = set()
+        for shape, group in groups.items():
+            start = time.perf_counter()
+            try:
+                group_results = self.model.predict(
+                    [image for _, image, _, _ in group],
+                    imgsz=list(shape) if isinstance(shape, tuple) else shape, **options
+                )
+            except Exception:
+                # Keep the schedule alive; retry these cameras on their next slot
+                failed.update(index for index, _, _, _ in group)
+                continue
+            seconds = (time.perf_counter() - start) / len(group)
+            for (index, image, transform, _), result in zip(group, group_results):
+                outputs[index].append((result, transform, image.shape, seconds))
+
+        results = []
+        for index, (frame, (transform, tiled), (_, state, _, _)) in enumerate(zip(frames, transforms, taken)):
+            if index in failed:
+                results.append(None)
+            elif tiled:
+                results.append(merge_results(
+                    [result for result, _, _, _ in outputs[index]],
+                    [piece_transform for _, piece_transform, _, _ in outputs[index]],
+                    frame, options['iou'], options['max_det']
+                ))
+            elif transform is not None:
+                result, _, crop_shape, seconds = outputs[index][0]
+                state.roi_stats.add(frame.shape, crop_shape, seconds)
+                results.append(restore_result(result, frame, transform))
+            else:
+                results.append(outputs[index][0][0])
+
+        now = time.monotonic()
+        wall = time.time()
+        self.batches += 1
+        self.frames += len(frames)
+        for (camera_id, state, seq, timestamp), result in zip(taken, results):
+            with self._lock:
+                state.last_seq = seq
+                state.last_served = now
+                state.next_due = now + 1.0 / state.target_hz if state.target_hz > 0 else now
+                if result is None:
+                    continue
+                state.served.append(now)
+                state.result = result
+                state.result_time = wall
+            if self.on_result is not None:
+                try:
+                    self.on_result(camera_id, result, timestamp)
+                    state.last_error = None
+                except Exception as e:
+                    # A failing recorder (locked database, full disk) must not stop live detection
+                    with self._lock:
+                        state.record_errors += 1
+                        state.last_error = f"{type(e).__name__}: {e}"
@@ -0,0 +1,285 @@
+"""Date/camera partitioned Parquet archive of detection and queue history.
+
+Layout under ``root`` (hive-style partitions)::
+
+    detections/date=YYYY-MM-DD/camera=<id>/*.parquet         raw detections
+    detections_minute/date=YYYY-MM-DD/camera=<id>/*.parquet  per-minute aggregates
+    queue_metrics/date=YYYY-MM-DD/camera=<id>/*.parquet      per-minute queue buckets
+
+A background thread rolls new rows out of the SQLite hot store (and finished
+queue-metric minutes out of the in-memory rings), prunes archived rows from
+the hot store, and compacts raw partitions older than the retention window
+into per-minute aggregates. Queries filter on the ``date`` partition and push
+the remaining predicates into the Parquet scan, so only the matching files
+and row groups are read.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from optiqueue.detection_store import utc_offset
+from optiqueue.lazy_imports import pa, pads, pc
+
+RAW = 'detections'
+MINUTE = 'detections_minute'
+QUEUE = 'queue_metrics'
+EPOCH = date(1970, 1, 1)
+
+
+def local_dates(timestamps):
+    """Local calendar date (``YYYY-MM-DD``) of every timestamp"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    # UTC offsets (DST switches included) only change on quarter hours, so
+    # look the offset up once per quarter hour instead of once per row
+    quarters, inverse = np.unique((timestamps // 900).astype(np.int64), return_inverse=True)
+    offsets = np.array([utc_offset(quarter * 900) for quarter in quarters], dtype=np.float64)
+    days, inverse = np.unique(((timestamps + offsets[inverse]) // 86400).astype(np.int64), return_inverse=True)
+    labels = np.array([(EPOCH + timedelta(days=int(day))).isoformat() for day in days])
+    return labels[inverse] if len(labels) else labels
+
+
+def as_timestamp(value):
+    """Timestamp of a ``date``/``datetime``/number; dates mean local midnight"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    return float(value)
+
+
+class DetectionArchive:
+    """Parquet history rolled from the detection store and queue metrics"""
+
+    def __init__(self, root, store=None, queue_metrics=None, raw_retention_days=7,
+                 hot_retention_hours=24, interval=300):
+        self.root = root
+        self.store = store
+        self.queue_metrics = queue_metrics
+        self.raw_retention_days = raw_retention_days
+        self.hot_retention_hours = hot_retention_hours
+        self.interval = interval
+        self.last_roll = None
+        self.last_error = None
+        self._state_path = os.path.join(root, 'state.json')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(root, exist_ok=True)
+        self.state = self._load_state()
+
+    @property
+    def partitioning(self):
+        return pads.partitioning(pa.schema([('date', pa.string()), ('camera', pa.string())]), flavor='hive')
+
+    def _load_state(self):
+        try:
+            with open(self._state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'last_id': 0, 'queue_until': 0}
+
+    def _save_state(self):
+        tmp = self._state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self._state_path)
+
+    def _write(self, kind, table, basename):
+        pads.write_dataset(
+            table,
+            os.path.join(self.root, kind),
+            format='parquet',
+            partitioning=self.partitioning,
+            basename_template=basename + '-{i}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+
+    def _dataset(self, kind):
+        path = os.path.join(self.root, kind)
+        if not os.path.isdir(path):
+            return None
+        return pads.dataset(path, format='parquet', partitioning=self.partitioning)
+
+    # Background maintenance
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='detection-archive', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.maintain()
+
+    def maintain(self):
+        """Roll new history into Parquet and compact expired raw partitions"""
+        try:
+            self.roll()
+            self.compact()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def roll(self):
+        with self._lock:
+            if self.store is not None:
+                self._roll_detections()
+            if self.queue_metrics is not None:
+                self._roll_queue_metrics()
+            self.last_roll = time.time()
+
+    def _roll_detections(self):
+        while True:
+            rows = self.store.export_after(self.state['last_id'])
+            if not rows:
+                break
+            ids, ts, cameras, classes, confs, x1, y1, x2, y2 = zip(*rows)
+            table = pa.table({
+                'ts': pa.array(ts, pa.float64()),
+                'class': pa.array(classes, pa.string()),
+                'confidence': pa.array(confs, pa.float32()),
+                'x1': pa.array(x1, pa.float32()),
+                'y1': pa.array(y1, pa.float32()),
+                'x2': pa.array(x2, pa.float32()),
+                'y2': pa.array(y2, pa.float32()),
+                'date': pa.array(local_dates(ts), pa.string()),
+                'camera': pa.array(cameras, pa.string()),
+            })
+            # Named after the id range so a re-roll after a crash overwrites instead of duplicating
+            self._write(RAW, table, f"part-{ids[0]}-{ids[-1]}")
+            self.state['last_id'] = ids[-1]
+            self._save_state()
+        cutoff = time.time() - self.hot_retention_hours * 3600
+        self.store.prune(cutoff, self.state['last_id'])
+
+    def _roll_queue_metrics(self):
+        end = int(time.time() // 60) * 60
+        rows = self.queue_metrics.completed_buckets('1min', since=self.state['queue_until'], end=end)
+        if not rows:
+            return
+        cameras, metrics, starts, sums, counts, maxes = zip(*rows)
+        table = pa.table({
+            'metric': pa.array(metrics, pa.string()),
+            'ts': pa.array(starts, pa.float64()),
+            'sum': pa.array(sums, pa.float64()),
+            'count': pa.array(counts, pa.int64()),
+            'max': pa.array(maxes, pa.float64()),
+            'date': pa.array(local_dates(starts), pa.string()),
+            'camera': pa.array(cameras, pa.string()),
+        })
+        self._write(QUEUE, table, f"part-{int(min(starts))}-{int(max(starts))}")
+        self.state['queue_until'] = end
+        self._save_state()
+
+    def compact(self, today=None):
+        """Replace raw partitions older than the retention window with per-minute aggregates"""
+        today = today or date.today()
+        cutoff = (today - timedelta(days=self.raw_retention_days)).isoformat()
+        raw_root = os.path.join(self.root, RAW)
+        if not os.path.isdir(raw_root):
+            return []
+        expired = sorted(
+            name[len('date='):] for name in os.listdir(raw_root)
+            if name.startswith('date=') and name[len('date='):] < cutoff
+        )
+        with self._lock:
+            for day in expired:
+                table = self._dataset(RAW).to_table(filter=pads.field('date') == day)
+                if table.num_rows:
+                    self._write(MINUTE, self.minute_aggregate(table), f"compacted-{time.time_ns()}")
+                shutil.rmtree(os.path.join(raw_root, f"date={day}"))
+        return expired
+
+    @staticmethod
+    def minute_aggregate(table):
+        """Per-minute/camera/class count, confidence sum and max of raw detections"""
+        minute = pc.multiply(pc.floor(pc.divide(table['ts'], 60.0)), 60.0)
+        table = table.append_column('minute', minute)
+        grouped = table.group_by(['date', 'camera', 'minute', 'class']).aggregate([
+            ('confidence', 'count'),
+            ('confidence', 'sum'),
+            ('confidence', 'max'),
+        ])
+        return grouped.rename_columns(
+            ['date', 'camera', 'minute', 'class', 'count', 'conf_sum', 'conf_max']
+        ).select(['minute', 'class', 'count', 'conf_sum', 'conf_max', 'date', 'camera'])
+
+    # Queries
+
+    def _filter(self, start, end, cameras=None, classes=None, ts_field='ts'):
+        start, end = as_timestamp(start), as_timestamp(end)
+        first_day = datetime.fromtimestamp(start).strftime('%Y-%m-%d')
+        last_day = datetime.fromtimestamp(end).strftime('%Y-%m-%d')
+        # The date bounds prune partitions; the rest is pushed into the scan
+        expr = (pads.field('date') >= first_day) & (pads.field('date') <= last_day)
+        expr &= (pads.field(ts_field) >= start) & (pads.field(ts_field) < end)
+        if cameras is not None:
+            expr &= pads.field('camera').isin(list(cameras))
+        if classes is not None:
+            expr &= pads.field('class').isin(list(classes))
+        return expr
+
+    def detections(self, start, end, cameras=None, classes=None, columns=None):
+        """Raw (not yet compacted) detections with ``start <= ts < end`` as a pyarrow Table"""
+        dataset = self._dataset(RAW)
+        if dataset is None:
+            return None
+        return dataset.to_table(columns=columns, filter=self._filter(start, end, cameras, classes))
+
+    def minute_counts(self, start, end, cameras=None, classes=None):
+        """Per-minute detection counts over raw and compacted history"""
+        parts = []
+        raw = self.detections(start, end, cameras, classes, columns=['ts', 'class', 'confidence', 'date', 'camera'])
+        if raw is not None and raw.num_rows:
+            parts.append(self.minute_aggregate(raw))
+        dataset = self._dataset(MINUTE)
+        if dataset is not None:
+            parts.append(dataset.to_table(filter=self._filter(start, end, cameras, classes, ts_field='minute')))
+        parts = [part.select(['minute', 'class', 'count', 'conf_sum', 'conf_max', 'date', 'camera']) for part in parts]
+        if not parts:
+            return None
+        return pa.concat_tables(parts)
+
+    def queue_history(self, start, end, cameras=None, metric='queue_length'):
+        """Per-minute queue-metric buckets with ``start <= ts < end``"""
+        dataset = self._dataset(QUEUE)
+        if dataset is None:
+            return None
+        expr = self._filter(start, end, cameras) & (pads.field('metric') == metric)
+        return dataset.to_table(filter=expr)
+
+    def daily_counts(self, start, end, cameras=None):
+        """``{date: detections}`` for every day in range that has history"""
+        table = self.minute_counts(start, end, cameras)
+        if table is None or table.num_rows == 0:
+            return {}
+        grouped = table.group_by('date').aggregate([('count', 'sum')])
+        return dict(sorted(zip(grouped['date'].to_pylist(), grouped['count_sum'].to_pylist())))
+
+    def summary(self):
+        files = 0
+        size = 0
+        partitions = set()
+        for kind in (RAW, MINUTE, QUEUE):
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, kind)):
+                parquet = [name for name in filenames if name.endswith('.parquet')]
+                if parquet:
+                    partitions.add((kind, os.path.relpath(dirpath, self.root)))
+                files += len(parquet)
+                size += sum(os.path.getsize(os.path.join(dirpath, name)) for name in parquet)
+        return {
+            'partitions': len(partitions),
+            'files': files,
+            'bytes': size,
+            'last_id': self.state['last_id'],
+            'last_roll': self.last_roll,
+            'last_error': self.last_error,
+        }
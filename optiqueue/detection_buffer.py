@@ -0,0 +1,131 @@
+"""Compact in-memory detection buffer backed by a NumPy structured array.
+
+Each detection is a fixed 34-byte record instead of a Python dict, the buffer
+has a fixed capacity with ring semantics (the oldest rows are overwritten),
+and per-class aggregates are computed with ``np.bincount`` instead of Python
+loops.
+"""
+import threading
+import time
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('ts', np.int64),        # milliseconds since the epoch
+    ('cls', np.uint16),
+    ('conf', np.float32),
+    ('bbox', np.float32, (4,)),
+    ('camera', np.uint32),   # every video job adds a source, so 16 bits would wrap
+])
+
+
+def class_stats(cls, conf, names=None):
+    """Per-class count and mean confidence, most frequent class first.
+
+    ``cls``/``conf`` are parallel arrays; returns a list of
+    ``{'class', 'count', 'avg_conf'}`` dicts.
+    """
+    cls = np.asarray(cls, dtype=np.int64)
+    if cls.size == 0:
+        return []
+    counts = np.bincount(cls)
+    conf_sums = np.bincount(cls, weights=np.asarray(conf, dtype=np.float64), minlength=counts.size)
+    present = np.flatnonzero(counts)
+    present = present[np.argsort(-counts[present], kind='stable')]
+    return [
+        {
+            'class': names.get(int(cls_id), str(cls_id)) if names else int(cls_id),
+            'count': int(counts[cls_id]),
+            'avg_conf': float(conf_sums[cls_id] / counts[cls_id]),
+        }
+        for cls_id in present
+    ]
+
+
+class DetectionBuffer:
+    """Bounded ring of recent detections from every camera"""
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self._rows = np.zeros(capacity, dtype=DETECTION_DTYPE)
+        self._next = 0
+        self._size = 0
+        self._cameras = {}
+        self._camera_names = []
+        self.names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._rows.nbytes
+
+    def _camera_code(self, camera):
+        code = self._cameras.get(camera)
+        if code is None:
+            code = self._cameras[camera] = len(self._camera_names)
+            self._camera_names.append(camera)
+        return code
+
+    def append(self, camera, timestamp, cls, conf, bbox):
+        """Append parallel arrays of class ids, confidences and (N, 4) boxes"""
+        n = len(cls)
+        if n == 0:
+            return
+        if n > self.capacity:
+            cls, conf, bbox = cls[-self.capacity:], conf[-self.capacity:], bbox[-self.capacity:]
+            n = self.capacity
+        with self._lock:
+            rows = np.empty(n, dtype=DETECTION_DTYPE)
+            rows['ts'] = int(timestamp * 1000)
+            rows['cls'] = cls
+            rows['conf'] = conf
+            rows['bbox'] = bbox
+            rows['camera'] = self._camera_code(camera)
+            # Write in at most two slices when the ring wraps around
+            first = min(n, self.capacity - self._next)
+            self._rows[self._next:self._next + first] = rows[:first]
+            self._rows[:n - first] = rows[first:]
+            self._next = (self._next + n) % self.capacity
+            self._size = min(self._size + n, self.capacity)
+
+    def append_result(self, camera, result, timestamp=None):
+        data = result.boxes.data.cpu().numpy()
+        with self._lock:
+            self.names.update(result.names)
+        self.append(
+            camera,
+            time.time() if timestamp is None else timestamp,
+            data[:, 5],
+            data[:, 4],
+            data[:, :4]
+        )
+
+    def view(self, since=None, camera=None):
+        """Chronological copy of the buffered rows, optionally filtered"""
+        with self._lock:
+            if self._size < self.capacity:
+                rows = self._rows[:self._size].copy()
+            else:
+                rows = np.concatenate((self._rows[self._next:], self._rows[:self._next]))
+            camera_code = self._cameras.get(camera)
+        mask = np.ones(len(rows), dtype=bool)
+        if since is not None:
+            mask &= rows['ts'] >= int(since * 1000)
+        if camera is not None:
+            if camera_code is None:
+                return rows[:0]
+            mask &= rows['camera'] == camera_code
+        return rows[mask]
+
+    def class_stats(self, since=None, camera=None):
+        rows = self.view(since=since, camera=camera)
+        return class_stats(rows['cls'], rows['conf'], self.names)
+
+    def camera_counts(self, since=None):
+        """Detections per camera name"""
+        rows = self.view(since=since)
+        counts = np.bincount(rows['camera'], minlength=len(self._camera_names))
+        return {name: int(count) for name, count in zip(self._camera_names, counts) if count}
@@ -0,0 +1,157 @@
+"""Content-addressed cache of detection results.
+
+Entries are keyed by the SHA-256 of the image bytes, the model checksum and
+every inference parameter, so a re-uploaded snapshot or a Streamlit rerun
+never pays for a forward pass twice. Only the compact (N, 6) box array is
+stored; ``Results`` objects are rebuilt around the caller's image on a hit.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from optiqueue.lazy_imports import torch, ultralytics_results
+
+# ultralytics' predict() defaults, used when a caller does not pass them
+DEFAULT_PARAMS = {'conf': 0.25, 'iou': 0.7, 'imgsz': 640, 'max_det': 300}
+
+
+def to_orig_img(source):
+    """Convert a predict() source to the BGR array ultralytics would keep"""
+    if isinstance(source, np.ndarray):
+        return source
+    return np.ascontiguousarray(np.asarray(source.convert('RGB'))[:, :, ::-1])
+
+
+class DetectionCache:
+    """In-memory LRU tier backed by an optional size-bounded on-disk tier"""
+
+    def __init__(self, max_entries=1024, disk_dir=None, disk_max_bytes=0):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir if disk_dir and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._disk_files = OrderedDict()
+        self._disk_bytes = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.npy'):
+                    path = os.path.join(self.disk_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk_files[key] = size
+                self._disk_bytes += size
+
+    @staticmethod
+    def make_key(image_bytes, model_checksum, **params):
+        """Build the cache key for one image/model/parameter combination"""
+        params = {**DEFAULT_PARAMS, **params}
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        canonical = repr(sorted(params.items()))
+        return hashlib.sha256(f"{digest}|{model_checksum}|{canonical}".encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._memory[key]
+            if key in self._disk_files:
+                path = os.path.join(self.disk_dir, f"{key}.npy")
+                try:
+                    boxes = np.load(path)
+                    os.utime(path)
+                except OSError:
+                    self._drop_disk_entry(key)
+                else:
+                    self._disk_files.move_to_end(key)
+                    self._remember(key, boxes)
+                    self.stats['hits'] += 1
+                    self.stats['disk_hits'] += 1
+                    return boxes
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, boxes):
+        boxes = np.ascontiguousarray(boxes, dtype=np.float32)
+        with self._lock:
+            self._remember(key, boxes)
+            if self.disk_dir and key not in self._disk_files:
+                path = os.path.join(self.disk_dir, f"{key}.npy")
+                try:
+                    np.save(path, boxes)
+                except OSError:
+                    return
+                size = os.path.getsize(path)
+                self._disk_files[key] = size
+                self._disk_bytes += size
+                while self._disk_bytes > self.disk_max_bytes and len(self._disk_files) > 1:
+                    oldest = next(iter(self._disk_files))
+                    self._drop_disk_entry(oldest)
+                    try:
+                        os.remove(os.path.join(self.disk_dir, f"{oldest}.npy"))
+                    except OSError:
+                        pass
+
+    def predict(self, model, source, image_bytes, **kwargs):
+        """Drop-in for ``model.predict`` that consults the cache first"""
+        params = {name: kwargs[name] for name in kwargs if name not in ('verbose', 'stream')}
+        key = self.make_key(image_bytes, model.checksum, **params)
+        boxes = self.get(key)
+        if boxes is not None:
+            result = ultralytics_results.Results(to_orig_img(source), path='image0.jpg', names=model.names,
+                                                 boxes=torch.from_numpy(boxes.copy()))
+            return [result]
+        results = model.predict(source, **kwargs)
+        self.put(key, results[0].boxes.data.cpu().numpy())
+        return results
+
+    def predict_many(self, model, sources, image_bytes, **kwargs):
+        """Batched ``predict``: cache misses go to the model in one call"""
+        params = {name: kwargs[name] for name in kwargs if name not in ('verbose', 'stream')}
+        results = [None] * len(sources)
+        misses = []
+        for i, (source, data) in enumerate(zip(sources, image_bytes)):
+            key = self.make_key(data, model.checksum, **params)
+            boxes = self.get(key)
+            if boxes is None:
+                misses.append((i, key))
+            else:
+                results[i] = ultralytics_results.Results(to_orig_img(source), path=f'image{i}.jpg', names=model.names,
+                                                         boxes=torch.from_numpy(boxes.copy()))
+        if misses:
+            predicted = model.predict([sources[i] for i, _ in misses], **kwargs)
+            for (i, key), result in zip(misses, predicted):
+                self.put(key, result.boxes.data.cpu().numpy())
+                results[i] = result
+        return results
+
+    def summary(self):
+        """Counters for the Monitoring page"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._memory),
+                'disk_entries': len(self._disk_files),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _remember(self, key, boxes):
+        self._memory[key] = boxes
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _drop_disk_entry(self, key):
+        self._disk_bytes -= self._disk_files.pop(key, 0)
@@ -0,0 +1,302 @@
+"""Persistent detection store: SQLite in WAL mode behind a write-behind queue.
+
+Producers (camera scheduler, video jobs, image uploads) only enqueue rows; a
+single writer thread drains the queue and inserts them in batched
+transactions, so inference threads never wait on disk I/O. Readers use their
+own connection, which WAL lets run concurrently with the writer.
+
+Per-frame queue observations are folded into hourly and daily rollup tables
+by the same writer (one upsert per bucket and batch), so date-range charts
+read at most one row per camera and hour.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    class TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_camera_ts_class ON detections (camera, ts, class);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections (ts);
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (metric, bucket, camera)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (metric, bucket, camera)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_TABLES = {'hour': 'rollup_hourly', 'day': 'rollup_daily'}
+
+UPSERT = """
+INSERT INTO {table} (metric, bucket, camera, sum, count, max) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (metric, bucket, camera) DO UPDATE SET
+    sum = sum + excluded.sum,
+    count = count + excluded.count,
+    max = MAX(max, excluded.max)
+"""
+
+INSERT = """
+INSERT INTO detections (ts, camera, class, confidence, x1, y1, x2, y2)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def result_rows(camera, result, timestamp):
+    """Detection rows for every box of an ultralytics ``Results``"""
+    data = result.boxes.data.cpu().numpy()
+    names = result.names
+    return [
+        (timestamp, camera, names[int(cls)], float(conf), float(x1), float(y1), float(x2), float(y2))
+        for x1, y1, x2, y2, conf, cls in data[:, :6]
+    ]
+
+
+def local_midnight(timestamp):
+    return datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def utc_offset(timestamp):
+    """Seconds the local timezone is ahead of UTC at ``timestamp``"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).astimezone().utcoffset().total_seconds()
+
+
+def fold_observations(observations):
+    """Collapse ``(ts, camera, metric, value)`` rows into hourly and daily upsert rows.
+
+    Buckets start on local hours and local midnights, also in timezones
+    offset by a half or quarter hour from UTC.
+    """
+    buckets = {'hour': {}, 'day': {}}
+    # UTC offsets (DST switches included) only change on quarter hours, so
+    # the offset and local midnight are looked up once per quarter hour
+    quarters = {}
+    for timestamp, camera, metric, value in observations:
+        quarter = int(timestamp // 900)
+        if quarter not in quarters:
+            quarters[quarter] = (utc_offset(quarter * 900), int(local_midnight(quarter * 900)))
+        offset, midnight = quarters[quarter]
+        seconds = int(timestamp)
+        hour = seconds - (seconds + int(offset)) % 3600
+        for resolution, bucket in (('hour', hour), ('day', midnight)):
+            acc = buckets[resolution].get((metric, bucket, camera))
+            if acc is None:
+                buckets[resolution][(metric, bucket, camera)] = [value, 1, value]
+            else:
+                acc[0] += value
+                acc[1] += 1
+                acc[2] = max(acc[2], value)
+    return {
+        resolution: [key + tuple(acc) for key, acc in folded.items()]
+        for resolution, folded in buckets.items()
+    }
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class DetectionStore:
+    """Batched, persistent detection log shared by every session"""
+
+    def __init__(self, path, batch_size=500, flush_interval=0.5, max_pending=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.batches = 0
+        self.observations_written = 0
+        self.last_error = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._read_conn = connect(path)
+        self._read_lock = threading.Lock()
+        self._queue = queue.Queue(max_pending)
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name='detection-store', daemon=True)
+        self._writer.start()
+
+    def add(self, rows):
+        """Enqueue ``(ts, camera, class, confidence, x1, y1, x2, y2)`` rows"""
+        if rows:
+            self._queue.put(('detections', rows))
+
+    def add_observations(self, camera, values, timestamp=None):
+        """Enqueue ``{metric: value}`` observations for the hourly/daily rollups"""
+        timestamp = time.time() if timestamp is None else timestamp
+        rows = [(timestamp, camera, metric, float(value)) for metric, value in values.items()]
+        if rows:
+            self._queue.put(('observations', rows))
+
+    def add_result(self, camera, result, timestamp=None):
+        self.add(result_rows(camera, result, time.time() if timestamp is None else timestamp))
+
+    def flush(self):
+        """Block until everything enqueued so far is committed"""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._stop.set()
+        self._writer.join(timeout=5)
+        self._read_conn.close()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def tail(self, n=5, camera=None):
+        """Newest ``n`` detections, newest first (served by the ts/camera indexes)"""
+        if camera is None:
+            sql = 'SELECT ts, camera, class, confidence FROM detections ORDER BY ts DESC LIMIT ?'
+            args = (n,)
+        else:
+            sql = 'SELECT ts, camera, class, confidence FROM detections WHERE camera = ? ORDER BY ts DESC LIMIT ?'
+            args = (camera, n)
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, args).fetchall()
+        return [
+            {'ts': ts, 'camera': camera_id, 'class': class_name, 'confidence': confidence}
+            for ts, camera_id, class_name, confidence in rows
+        ]
+
+    def count(self, since=None, camera=None):
+        """Number of stored detections, optionally since a timestamp and for one camera"""
+        clauses, args = [], []
+        if camera is not None:
+            clauses.append('camera = ?')
+            args.append(camera)
+        if since is not None:
+            clauses.append('ts >= ?')
+            args.append(since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._read_lock:
+            return self._read_conn.execute(f'SELECT COUNT(*) FROM detections{where}', args).fetchone()[0]
+
+    def export_after(self, last_id, limit=200_000):
+        """Up to ``limit`` rows with ``id > last_id``, oldest first"""
+        with self._read_lock:
+            return self._read_conn.execute(
+                'SELECT id, ts, camera, class, confidence, x1, y1, x2, y2 FROM detections '
+                'WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, limit)
+            ).fetchall()
+
+    def prune(self, before, max_id):
+        """Delete rows older than ``before`` that have already been archived (``id <= max_id``)"""
+        with self._read_lock:
+            with self._read_conn:
+                cursor = self._read_conn.execute('DELETE FROM detections WHERE ts < ? AND id <= ?', (before, max_id))
+        return cursor.rowcount
+
+    def rollup(self, metric, start, end, resolution='hour', cameras=None, stat='mean', combine='sum'):
+        """Sparse ``(bucket_starts, values)`` of a metric from the rollup tables.
+
+        Per camera the bucket's ``stat`` (``'mean'``, ``'sum'`` or ``'max'``)
+        is taken; cameras are then summed or averaged (``combine``), matching
+        ``QueueAggregator.series``.
+        """
+        per_camera = {'mean': 'sum / count', 'sum': 'sum', 'max': 'max'}[stat]
+        across = {'sum': 'SUM', 'mean': 'AVG'}[combine]
+        sql = (
+            f"SELECT bucket, {across}({per_camera}) FROM {ROLLUP_TABLES[resolution]} "
+            "WHERE metric = ? AND bucket >= ? AND bucket < ?"
+        )
+        args = [metric, int(start), int(end)]
+        if cameras is not None:
+            cameras = list(cameras)
+            sql += f" AND camera IN ({', '.join('?' * len(cameras))})"
+            args += cameras
+        sql += ' GROUP BY bucket ORDER BY bucket'
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, args).fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        buckets, values = zip(*rows)
+        return np.array(buckets, dtype=np.int64), np.array(values, dtype=np.float64)
+
+    def summary(self):
+        return {
+            'rows_written': self.rows_written,
+            'observations_written': self.observations_written,
+            'batches': self.batches,
+            'avg_batch': (self.rows_written + self.observations_written) / self.batches if self.batches else 0.0,
+            'pending': self.pending,
+            'last_error': self.last_error,
+        }
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        try:
+            while not self._stop.is_set():
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [first]
+                rows = len(first[1])
+                deadline = time.monotonic() + self.flush_interval
+                # Keep collecting until the batch is full or the interval is up
+                while rows < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    rows += len(item[1])
+                try:
+                    self._write_batch(conn, batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    self.last_error = str(e)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        detections = [row for kind, rows in batch if kind == 'detections' for row in rows]
+        observations = [row for kind, rows in batch if kind == 'observations' for row in rows]
+        with conn:
+            if detections:
+                conn.executemany(INSERT, detections)
+            if observations:
+                for resolution, rows in fold_observations(observations).items():
+                    conn.executemany(UPSERT.format(table=ROLLUP_TABLES[resolution]), rows)
+        self.rows_written += len(detections)
+        self.observations_written += len(observations)
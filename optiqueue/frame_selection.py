@@ -0,0 +1,72 @@
+"""Pick which video frames actually need a forward pass.
+
+Queue footage is mostly static, so three cheap gates decide whether a frame
+is sent to the model: a fixed frame stride, a maximum inference rate in
+video time, and a frame-difference motion gate on a small grayscale
+thumbnail. Frames that are skipped reuse the previous detections.
+"""
+import numpy as np
+
+from optiqueue.lazy_imports import cv2
+
+THUMBNAIL_SIZE = (64, 36)
+
+
+class FrameSelector:
+    """Decide per frame whether to run inference or reuse the last result"""
+
+    def __init__(self, fps=30.0, stride=1, sample_fps=0.0, motion_threshold=0.0, max_reuse_seconds=2.0):
+        self.fps = fps or 30.0
+        self.stride = max(1, int(stride))
+        self.min_interval = 1.0 / sample_fps if sample_fps else 0.0
+        self.motion_threshold = float(motion_threshold)
+        self.max_reuse_seconds = float(max_reuse_seconds)
+        self._last_time = None
+        self._last_thumb = None
+        self.selected = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_settings(cls, settings, fps):
+        if not settings:
+            return cls(fps=fps)
+        return cls(
+            fps=fps,
+            stride=settings.get('frame_stride', 1),
+            sample_fps=settings.get('sample_fps', 0.0),
+            motion_threshold=settings.get('motion_threshold', 0.0),
+            max_reuse_seconds=settings.get('max_reuse_seconds', 2.0),
+        )
+
+    def select(self, index, frame):
+        """Return True if ``frame`` (the ``index``-th frame) should be inferred"""
+        timestamp = index / self.fps
+        if self._last_time is None:
+            return self._accept(timestamp, self._thumbnail(frame))
+
+        elapsed = timestamp - self._last_time
+        if index % self.stride != 0 or elapsed < self.min_interval:
+            return self._reject()
+
+        thumb = None
+        if self.motion_threshold > 0:
+            thumb = self._thumbnail(frame)
+            motion = np.abs(thumb.astype(np.int16) - self._last_thumb).mean()
+            if motion < self.motion_threshold and elapsed < self.max_reuse_seconds:
+                return self._reject()
+        return self._accept(timestamp, thumb)
+
+    def _accept(self, timestamp, thumb):
+        self._last_time = timestamp
+        if thumb is not None:
+            self._last_thumb = thumb.astype(np.int16)
+        self.selected += 1
+        return True
+
+    def _reject(self):
+        self.skipped += 1
+        return False
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
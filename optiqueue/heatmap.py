@@ -0,0 +1,166 @@
+"""Incremental weekday x hour activity heatmap.
+
+Observations are folded into 7x24 sum/count/max grids, one per camera and
+ISO week, in O(1). Grids merge cell-wise, so a heatmap for any set of cameras
+and weeks (or for several processes' stores) is a sum of small arrays
+instead of a scan over history.
+"""
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def week_key(day):
+    """ISO week of a date, e.g. ``'2024-W07'``"""
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_days(key):
+    """The seven dates (Monday first) of an ISO week key"""
+    year, week = key.split('-W')
+    return [date.fromisocalendar(int(year), int(week), weekday) for weekday in range(1, 8)]
+
+
+class HeatmapGrid:
+    """sum/count/max per weekday (rows, Monday first) and hour (columns)"""
+
+    def __init__(self):
+        self.sum = np.zeros((7, 24))
+        self.count = np.zeros((7, 24), dtype=np.int64)
+        self.max = np.zeros((7, 24))
+
+    def add(self, weekday, hour, value):
+        self.sum[weekday, hour] += value
+        self.count[weekday, hour] += 1
+        if value > self.max[weekday, hour]:
+            self.max[weekday, hour] = value
+
+    def merge(self, other):
+        self.sum += other.sum
+        self.count += other.count
+        np.maximum(self.max, other.max, out=self.max)
+        return self
+
+    def mean(self):
+        """Mean per cell; NaN where nothing was observed"""
+        return np.where(self.count > 0, self.sum / np.maximum(self.count, 1), np.nan)
+
+    def rows(self, keep):
+        """Copy with only the weekday rows where ``keep`` (7 bools) is True"""
+        keep = np.asarray(keep, dtype=bool)[:, None]
+        grid = HeatmapGrid()
+        grid.sum = np.where(keep, self.sum, 0.0)
+        grid.count = np.where(keep, self.count, 0)
+        grid.max = np.where(keep, self.max, 0.0)
+        return grid
+
+
+class HeatmapAccumulator:
+    """Per-camera, per-week heatmap grids persisted to an ``.npz`` file"""
+
+    def __init__(self, path=None, save_interval=60):
+        self.path = path
+        self.save_interval = save_interval
+        self._grids = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_save = time.time()
+        if path and os.path.exists(path):
+            self.merge(self.load(path))
+
+    def observe(self, camera, value, timestamp=None):
+        """Fold one observation into its camera/week/weekday/hour cell (O(1))"""
+        moment = datetime.fromtimestamp(time.time() if timestamp is None else timestamp)
+        key = (camera, week_key(moment.date()))
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is None:
+                grid = self._grids[key] = HeatmapGrid()
+            grid.add(moment.weekday(), moment.hour, value)
+        if self.path and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def merge(self, other):
+        """Add another accumulator's grids into this one"""
+        with self._lock:
+            for key, grid in other.items():
+                self._grids.setdefault(key, HeatmapGrid()).merge(grid)
+        return self
+
+    def items(self):
+        with self._lock:
+            return list(self._grids.items())
+
+    def _camera_grids(self, cameras=None, start=None, end=None):
+        """One merged grid per camera over the ``[start, end]`` dates (inclusive)"""
+        merged = {}
+        for (camera, week), grid in self.items():
+            if cameras is not None and camera not in cameras:
+                continue
+            if start is not None or end is not None:
+                # Each row of a weekly grid is one date, so the range is exact to the day
+                keep = [(start is None or day >= start) and (end is None or day <= end) for day in week_days(week)]
+                if not any(keep):
+                    continue
+                if not all(keep):
+                    grid = grid.rows(keep)
+            merged.setdefault(camera, HeatmapGrid()).merge(grid)
+        return merged
+
+    def grid(self, cameras=None, start=None, end=None):
+        """Merged grid for ``cameras`` over the ``[start, end]`` dates (inclusive)"""
+        merged = HeatmapGrid()
+        for grid in self._camera_grids(cameras, start, end).values():
+            merged.merge(grid)
+        return merged
+
+    def profile(self, cameras=None, start=None, end=None):
+        """7x24 per-camera means summed across cameras; NaN where no camera has data.
+
+        Cameras are summed like the queue-length charts, so the heatmap
+        shows the total queue rather than the average camera.
+        """
+        means = [grid.mean() for grid in self._camera_grids(cameras, start, end).values()]
+        if not means:
+            return np.full((7, 24), np.nan)
+        means = np.array(means)
+        return np.where(np.isnan(means).all(axis=0), np.nan, np.nansum(means, axis=0))
+
+    def save(self, path=None):
+        """Atomically write every grid to ``path`` (default: the accumulator's path)"""
+        path = path or self.path
+        with self._save_lock:
+            self._save(path)
+
+    def _save(self, path):
+        items = self.items()
+        arrays = {
+            'cameras': np.array([camera for (camera, _), _ in items], dtype=str),
+            'weeks': np.array([week for (_, week), _ in items], dtype=str),
+            'sum': np.array([grid.sum for _, grid in items]).reshape(-1, 7, 24),
+            'count': np.array([grid.count for _, grid in items], dtype=np.int64).reshape(-1, 7, 24),
+            'max': np.array([grid.max for _, grid in items]).reshape(-1, 7, 24),
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        self._last_save = time.time()
+
+    @classmethod
+    def load(cls, path):
+        accumulator = cls()
+        with np.load(path) as data:
+            for i, (camera, week) in enumerate(zip(data['cameras'], data['weeks'])):
+                grid = HeatmapGrid()
+                grid.sum = data['sum'][i].astype(np.float64)
+                grid.count = data['count'][i].astype(np.int64)
+                grid.max = data['max'][i].astype(np.float64)
+                accumulator._grids[(str(camera), str(week))] = grid
+        return accumulator
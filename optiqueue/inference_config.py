@@ -0,0 +1,121 @@
+"""Inference settings shared by every page and background worker.
+
+One ``InferenceConfig`` holds the knobs that trade accuracy for latency:
+thresholds, input size, detection cap, class filter, FP16 and batch size.
+It is persisted as JSON under the data directory, so every page, session
+and restart sees the same values. The batcher and camera scheduler read it
+on every batch, so a saved change applies without reloading the model.
+
+Classes are stored by name, not index, so the filter survives switching to
+a model version with a different class order.
+"""
+import json
+import os
+import threading
+
+IMGSZ_CHOICES = (320, 480, 640, 960, 1280)
+DEFAULTS = {
+    'conf': 0.25,
+    'iou': 0.45,
+    'imgsz': 640,
+    'max_det': 300,
+    'classes': [],
+    'half': False,
+    'batch_size': 8,
+}
+
+
+def clean_values(values):
+    """Validated copy of config ``values``; raises ValueError"""
+    cleaned = dict(values)
+    for name in ('conf', 'iou'):
+        cleaned[name] = float(values[name])
+        if not 0.0 <= cleaned[name] <= 1.0:
+            raise ValueError(f"{name} must be between 0 and 1")
+    cleaned['imgsz'] = int(values['imgsz'])
+    if cleaned['imgsz'] < 32 or cleaned['imgsz'] % 32:
+        raise ValueError("imgsz must be a positive multiple of 32")
+    cleaned['max_det'] = int(values['max_det'])
+    if not 1 <= cleaned['max_det'] <= 3000:
+        raise ValueError("max_det must be between 1 and 3000")
+    cleaned['batch_size'] = int(values['batch_size'])
+    if not 1 <= cleaned['batch_size'] <= 64:
+        raise ValueError("batch_size must be between 1 and 64")
+    cleaned['classes'] = [str(name).strip() for name in values['classes'] or [] if str(name).strip()]
+    cleaned['half'] = bool(values['half'])
+    return cleaned
+
+
+class InferenceConfig:
+    """Process-wide, persisted inference settings"""
+
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = clean_values({**DEFAULTS, **(defaults or {})})
+        self._lock = threading.Lock()
+        self._values = self._load()
+        # Called with the new values after every update
+        self.on_update = None
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            return clean_values({**self.defaults, **{name: saved[name] for name in saved if name in DEFAULTS}})
+        except (OSError, ValueError, TypeError):
+            return dict(self.defaults)
+
+    def get(self):
+        with self._lock:
+            return dict(self._values)
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def update(self, **values):
+        """Validate, persist and apply new values; raises ValueError"""
+        unknown = set(values) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown inference settings: {', '.join(sorted(unknown))}")
+        with self._lock:
+            cleaned = clean_values({**self._values, **values})
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(cleaned, f, indent=2)
+            os.replace(tmp, self.path)
+            self._values = cleaned
+        if self.on_update is not None:
+            self.on_update(dict(cleaned))
+        return dict(cleaned)
+
+    def reset(self):
+        return self.update(**self.defaults)
+
+    def class_ids(self, names):
+        """Ids of the configured classes in a model's ``names``; None means every class.
+
+        Names the model does not have are ignored, so a filter never silently
+        turns into "detect nothing".
+        """
+        wanted = {name.lower() for name in self['classes']}
+        ids = [cls_id for cls_id, name in names.items() if name.lower() in wanted]
+        return ids or None
+
+    def predict_kwargs(self, names=None):
+        """``predict`` keyword arguments for a model with class ``names``"""
+        values = self.get()
+        kwargs = {
+            'conf': values['conf'],
+            'iou': values['iou'],
+            'imgsz': values['imgsz'],
+            'max_det': values['max_det'],
+        }
+        if values['half']:
+            # Only sent when enabled: newer ultralytics warns that passing 'half' is deprecated
+            kwargs['half'] = True
+        classes = self.class_ids(names) if names else None
+        if classes is not None:
+            kwargs['classes'] = classes
+        return kwargs
@@ -0,0 +1,84 @@
+"""Lazy facade for the heavy ML, video and charting imports.
+
+Streamlit re-executes the app script on every interaction and a cold start
+would otherwise pay for torch, ultralytics, OpenCV, plotly and pandas even
+on pages that never touch them. The proxies below import their module on
+first attribute access and record how long that took.
+"""
+import importlib
+import sys
+import threading
+import time
+
+_import_times = {}
+
+
+class LazyModule:
+    """Module proxy that imports ``name`` on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    cached = self._name in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    _import_times[self._name] = (time.perf_counter() - start, cached)
+                    self._module = module
+        return self._module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+_registry = {}
+
+
+def lazy_import(name):
+    """Return the shared lazy proxy for module ``name``"""
+    if name not in _registry:
+        _registry[name] = LazyModule(name)
+    return _registry[name]
+
+
+cv2 = lazy_import('cv2')
+torch = lazy_import('torch')
+ultralytics = lazy_import('ultralytics')
+ultralytics_results = lazy_import('ultralytics.engine.results')
+go = lazy_import('plotly.graph_objects')
+px = lazy_import('plotly.express')
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+pads = lazy_import('pyarrow.dataset')
+ort = lazy_import('onnxruntime')
+onnx = lazy_import('onnx')
+ort_quantization = lazy_import('onnxruntime.quantization')
+ort_preprocess = lazy_import('onnxruntime.quantization.shape_inference')
+
+
+def import_report():
+    """One row per lazily imported module, slowest first"""
+    rows = []
+    for name, proxy in _registry.items():
+        seconds, cached = _import_times.get(name, (None, False))
+        rows.append({
+            'module': name,
+            'loaded': proxy.is_loaded,
+            'import_ms': round(seconds * 1000, 1) if seconds is not None else None,
+            'already_imported': cached,
+        })
+    return sorted(rows, key=lambda row: -(row['import_ms'] or 0))
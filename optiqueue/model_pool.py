@@ -0,0 +1,261 @@
+"""Process-wide pool of pre-loaded YOLO model instances."""
+import hashlib
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from optiqueue.backends import INT8_BACKEND, load_model, tune_onnx_session
+from optiqueue.lazy_imports import torch
+
+DEFAULT_WEIGHTS = 'best.pt'
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a weights file, used to key caches and exported artifacts"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PooledModel:
+    """A loaded YOLO instance guarded by its own lock"""
+
+    def __init__(self, index, model):
+        self.index = index
+        self.model = model
+        self.lock = threading.Lock()
+
+
+class ModelPool:
+    """N warmed-up YOLO instances shared by every session.
+
+    Callers check an instance out, run inference on it and hand it back, so
+    concurrent sessions never share a predictor and no rerun ever reloads the
+    weights from disk. The instances run on one of the ``backends``; switching
+    backend or weights loads a new set and swaps it in while in-flight calls
+    finish on the old one.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, size=2, warmup_imgsz=640, torch_threads=None,
+                 backend='pytorch', artifact_dir=None, warmup_batch_sizes=(1,)):
+        if torch_threads:
+            # Intra-op threads are process-wide; batched forward passes use them all
+            torch.set_num_threads(int(torch_threads))
+
+        self.size = max(1, int(size))
+        if isinstance(warmup_imgsz, int) or not warmup_imgsz:
+            warmup_imgsz = (warmup_imgsz or 640,)
+        self.warmup_sizes = tuple(sorted({int(imgsz) for imgsz in warmup_imgsz}))
+        self.warmup_batch_sizes = tuple(sorted({max(1, int(batch)) for batch in warmup_batch_sizes}))
+        # Exports have dynamic shapes; this is only their nominal input size
+        self.warmup_imgsz = self.warmup_sizes[-1]
+        self.artifact_dir = artifact_dir or os.path.join(os.path.dirname(os.path.abspath(weights)), '.exports')
+        self._stats_lock = threading.Lock()
+        # Every swap (new weights or new backend) loads and swaps under this
+        # lock, so two swaps can never finish in the wrong order
+        self._swap_lock = threading.RLock()
+        self.stats = {'checkouts': 0, 'contended': 0, 'wait_time': 0.0}
+        self.activation = None
+        self.warmup = None
+        self._warming = 0
+        self.use_weights(weights, backend)
+
+    def _warm_up(self, model, shapes=None):
+        """Run every configured (imgsz, batch size), or only ``shapes``, once; returns the seconds per shape.
+
+        The first forward pass of a shape pays for layer fusion, allocator
+        growth and thread-pool spin-up, so it is done here instead of on the
+        first real request. Noise frames also exercise NMS with candidates.
+        """
+        if shapes is None:
+            shapes = [(imgsz, batch) for imgsz in self.warmup_sizes for batch in self.warmup_batch_sizes]
+        rng = np.random.default_rng(0)
+        frames = {}
+        timings = {}
+        for imgsz, batch in shapes:
+            if imgsz not in frames:
+                frames[imgsz] = rng.integers(0, 256, (imgsz, imgsz, 3), dtype=np.uint8)
+            start = time.perf_counter()
+            model.predict([frames[imgsz]] * batch, imgsz=imgsz, verbose=False)
+            timings[(imgsz, batch)] = time.perf_counter() - start
+        return timings
+
+    def warm_up_async(self, imgsz, batch_size):
+        """Warm every instance up at a newly configured image and batch size, in the background.
+
+        The new sizes are kept, so later swaps warm them up too. Returns
+        False when both are warmed up already.
+        """
+        imgsz, batch_size = int(imgsz), max(1, int(batch_size))
+        with self._stats_lock:
+            if imgsz in self.warmup_sizes and batch_size in self.warmup_batch_sizes:
+                return False
+            sizes = tuple(sorted(set(self.warmup_sizes) | {imgsz}))
+            batch_sizes = tuple(sorted(set(self.warmup_batch_sizes) | {batch_size}))
+            shapes = [
+                (size, batch) for size in sizes for batch in batch_sizes
+                if size not in self.warmup_sizes or batch not in self.warmup_batch_sizes
+            ]
+            self.warmup_sizes, self.warmup_batch_sizes = sizes, batch_sizes
+            self._warming += 1
+        threading.Thread(target=self._warm_up_shapes, args=(shapes,), name='model-warmup', daemon=True).start()
+        return True
+
+    def _warm_up_shapes(self, shapes):
+        try:
+            # A swap waits, and then warms the new instances at every size itself
+            with self._swap_lock:
+                timings = {}
+                for instance in self.instances:
+                    with instance.lock:
+                        for shape, seconds in self._warm_up(instance.model, shapes).items():
+                            timings.setdefault(shape, []).append(seconds * 1000)
+                with self._stats_lock:
+                    self.warmup['shapes'] = sorted(
+                        self.warmup['shapes'] + [
+                            {'imgsz': imgsz, 'batch': batch, 'ms': max(ms), 'instance_ms': ms}
+                            for (imgsz, batch), ms in timings.items()
+                        ],
+                        key=lambda shape: (shape['imgsz'], shape['batch'])
+                    )
+        finally:
+            with self._stats_lock:
+                self._warming -= 1
+
+    @property
+    def warming(self):
+        """True while new image or batch sizes are being warmed up"""
+        return self._warming > 0
+
+    def _load_instances(self, weights, checksum, backend):
+        """Load and warm up ``size`` instances; returns them plus a warm-up report"""
+        instances = []
+        start = time.perf_counter()
+        timings = {}
+        for index in range(self.size):
+            model, path = load_model(weights, backend, self.artifact_dir, checksum, self.warmup_imgsz)
+            if backend in ('onnx', INT8_BACKEND):
+                # The tuning replaces the session of a built predictor, so build one first
+                model.predict(np.zeros((32, 32, 3), dtype=np.uint8), imgsz=32, verbose=False)
+                tune_onnx_session(model, path, (os.cpu_count() or 1) // self.size)
+            for shape, seconds in self._warm_up(model).items():
+                timings.setdefault(shape, []).append(seconds * 1000)
+            instances.append(PooledModel(index, model))
+        # Per shape: the slowest instance, plus every instance in pool order
+        warmup = {
+            'seconds': time.perf_counter() - start,
+            'shapes': [{'imgsz': imgsz, 'batch': batch, 'ms': max(ms), 'instance_ms': ms}
+                       for (imgsz, batch), ms in sorted(timings.items())],
+        }
+        return instances, warmup
+
+    def use_weights(self, weights, backend=None):
+        """Load ``weights`` on ``backend`` (default: the current one) and swap them in"""
+        checksum = file_checksum(weights)
+        with self._swap_lock:
+            if backend is None:
+                # INT8 graphs are quantized per weights, so new weights start on the FP32 graph
+                backend = self.backend
+                if backend == INT8_BACKEND and checksum != self.weights_checksum:
+                    backend = 'onnx'
+            instances, warmup = self._load_instances(weights, checksum, backend)
+            available = queue.Queue()
+            for instance in instances:
+                available.put(instance)
+            with self._stats_lock:
+                self.instances = instances
+                self._available = available
+                self.warmup = warmup
+                self.weights = weights
+                self.weights_checksum = checksum
+                self.backend = backend
+                # Backends differ slightly, so cached detections are keyed by backend too
+                self.checksum = checksum if backend == 'pytorch' else f"{checksum}:{backend}"
+
+    def use_backend(self, backend):
+        """Load ``backend`` instances (exporting the weights once) and swap them in.
+
+        A running activation is waited for, so its new weights are what switch.
+        """
+        with self._swap_lock:
+            self.use_weights(self.weights, backend)
+
+    @property
+    def activating(self):
+        """True while a background activation is loading new weights"""
+        activation = self.activation
+        return activation is not None and activation['state'] == 'loading'
+
+    def activate_async(self, weights, backend=None, on_ready=None):
+        """Load and warm up ``weights`` on a background thread, then swap them in.
+
+        Detection keeps running on the current instances until the swap;
+        ``on_ready`` runs once the new ones serve. Returns False while another
+        activation is still loading.
+        """
+        with self._stats_lock:
+            if self.activation is not None and self.activation['state'] == 'loading':
+                return False
+            self.activation = {'weights': weights, 'state': 'loading', 'error': None,
+                               'started': time.time(), 'finished': None}
+        threading.Thread(
+            target=self._activate, args=(weights, backend, on_ready), name='model-activation', daemon=True
+        ).start()
+        return True
+
+    def _activate(self, weights, backend, on_ready):
+        state, error = 'ready', None
+        try:
+            self.use_weights(weights, backend)
+            if on_ready is not None:
+                on_ready()
+        except Exception as e:
+            state, error = 'failed', str(e)
+        with self._stats_lock:
+            self.activation.update(state=state, error=error, finished=time.time())
+
+    @property
+    def names(self):
+        return self.instances[0].model.names
+
+    @property
+    def task(self):
+        return self.instances[0].model.task
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow an idle model instance, blocking until one is free"""
+        start = time.perf_counter()
+        # Instances go back to the set they came from, so a swapped-out set drains away
+        available = self._available
+        contended = available.empty()
+        instance = available.get(timeout=timeout)
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats['checkouts'] += 1
+            self.stats['contended'] += int(contended)
+            self.stats['wait_time'] += waited
+        try:
+            with instance.lock:
+                yield instance.model
+        finally:
+            available.put(instance)
+
+    def predict(self, source, **kwargs):
+        """Run ``YOLO.predict`` on a pooled instance"""
+        kwargs.setdefault('verbose', False)
+        if kwargs.get('stream'):
+            return self._predict_stream(source, **kwargs)
+        with self.checkout() as model:
+            return model.predict(source, **kwargs)
+
+    def _predict_stream(self, source, **kwargs):
+        # Hold the instance for as long as the caller consumes the generator
+        with self.checkout() as model:
+            yield from model.predict(source, **kwargs)
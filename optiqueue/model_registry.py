@@ -0,0 +1,114 @@
+"""Versioned model registry on disk with atomic activation.
+
+Every uploaded weights file is stored once under ``<root>/versions/<id>/``
+and never overwritten, so any earlier version can be re-activated. The
+``registry.json`` index lists the versions and names the active one; it is
+rewritten through a temporary file and ``os.replace``, so a crash leaves
+either the old or the new index, never a half-written one.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class ModelRegistry:
+    """Uploaded weights versions plus a pointer to the active one"""
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, 'registry.json')
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {'versions': [], 'active': None}
+        index.setdefault('versions', [])
+        index.setdefault('active', None)
+        return index
+
+    def _write(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def versions(self):
+        """Every version, newest first"""
+        with self._lock:
+            return list(reversed(self._read()['versions']))
+
+    def get(self, version_id):
+        with self._lock:
+            for version in self._read()['versions']:
+                if version['id'] == version_id:
+                    return version
+        return None
+
+    def active(self):
+        """The active version, or None before the first activation"""
+        with self._lock:
+            index = self._read()
+        return next((version for version in index['versions'] if version['id'] == index['active']), None)
+
+    def path(self, version):
+        return os.path.join(self.root, 'versions', version['id'], version['file'])
+
+    def add(self, data, name):
+        """Store uploaded weights bytes as a new version; an identical file returns its existing version"""
+        checksum = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            index = self._read()
+            for version in index['versions']:
+                if version['checksum'] == checksum:
+                    return version
+            version = {
+                'id': f"{time.strftime('%Y%m%d-%H%M%S')}-{checksum[:8]}",
+                'name': name,
+                'file': 'weights.pt',
+                'checksum': checksum,
+                'size': len(data),
+                'uploaded_at': time.time(),
+                'activated_at': None,
+            }
+            path = self.path(version)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            index['versions'].append(version)
+            self._write(index)
+        return version
+
+    def add_file(self, path, name=None):
+        with open(path, 'rb') as f:
+            return self.add(f.read(), name or os.path.basename(path))
+
+    def activate(self, version_id):
+        """Point the registry at ``version_id``; raises KeyError for an unknown version"""
+        with self._lock:
+            index = self._read()
+            version = next((version for version in index['versions'] if version['id'] == version_id), None)
+            if version is None:
+                raise KeyError(version_id)
+            version['activated_at'] = time.time()
+            index['active'] = version_id
+            self._write(index)
+        return version
+
+    def delete(self, version_id):
+        """Remove an inactive version and its weights; raises ValueError for the active one"""
+        with self._lock:
+            index = self._read()
+            if index['active'] == version_id:
+                raise ValueError("The active model version cannot be deleted")
+            index['versions'] = [version for version in index['versions'] if version['id'] != version_id]
+            self._write(index)
+        shutil.rmtree(os.path.join(self.root, 'versions', version_id), ignore_errors=True)
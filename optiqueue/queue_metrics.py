@@ -0,0 +1,198 @@
+"""Incremental per-camera queue metrics in fixed-size ring buffers.
+
+Every observation (for example the person count of one inferred frame) is
+folded into a sum/count/max bucket at three resolutions. Buckets live in
+fixed-size NumPy rings indexed by ``bucket_number % size``, so memory is
+bounded, writes are O(1) and reading a chart series is O(buckets) without
+touching raw detections.
+"""
+import threading
+import time
+
+import numpy as np
+
+from optiqueue.zones import zone_counts, zone_membership
+
+# name -> (bucket width in seconds, number of buckets kept)
+RESOLUTIONS = {
+    '1s': (1, 3600),
+    '1min': (60, 24 * 60),
+    '1h': (3600, 30 * 24),
+}
+
+PERSON_CLASSES = {'person', 'people', 'customer', 'pedestrian'}
+
+
+def person_mask(result):
+    """Boolean mask of person boxes in a ``Results``; every box if the model has no person class"""
+    person_ids = [cls_id for cls_id, name in result.names.items() if name.lower() in PERSON_CLASSES]
+    classes = result.boxes.cls.cpu().numpy()
+    if not person_ids:
+        return np.ones(len(classes), dtype=bool)
+    return np.isin(classes, person_ids)
+
+
+def queue_mask(result, zones=None):
+    """Person boxes standing in a queue zone; every person box when no queue zone is set"""
+    mask = person_mask(result)
+    queue_zones = [zone for zone in zones or [] if zone['type'] == 'queue']
+    if queue_zones:
+        membership = zone_membership(result.boxes.xyxy.cpu().numpy(), queue_zones, result.orig_shape)
+        mask &= membership.any(axis=1)
+    return mask
+
+
+def count_people(result):
+    """Number of person boxes in a ``Results``"""
+    return int(person_mask(result).sum())
+
+
+def _local_hours(starts, values):
+    """Local weekday and hour of every non-empty hourly value"""
+    starts = np.asarray(starts)
+    values = np.asarray(values, dtype=np.float64)
+    has_data = ~np.isnan(values)
+    local = [time.localtime(ts) for ts in starts[has_data]]
+    days = np.array([t.tm_wday for t in local], dtype=np.int64)
+    hours = np.array([t.tm_hour for t in local], dtype=np.int64)
+    return days, hours, values[has_data]
+
+
+def hourly_profile(starts, values):
+    """Mean of hourly values by local hour of day (24 values); NaN where empty"""
+    _, hours, values = _local_hours(starts, values)
+    sums = np.bincount(hours, weights=values, minlength=24)
+    counts = np.bincount(hours, minlength=24)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+class RingSeries:
+    """sum/count/max buckets of one metric at one resolution"""
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.bucket = np.full(size, -1, dtype=np.int64)
+        self.sum = np.zeros(size, dtype=np.float64)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.max = np.zeros(size, dtype=np.float64)
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.width)
+        slot = bucket % self.size
+        if self.bucket[slot] != bucket:
+            # The slot still holds a bucket from a previous lap of the ring
+            self.bucket[slot] = bucket
+            self.sum[slot] = 0.0
+            self.count[slot] = 0
+            self.max[slot] = value
+        self.sum[slot] += value
+        self.count[slot] += 1
+        self.max[slot] = max(self.max[slot], value)
+
+    def window(self, end_timestamp, n):
+        """Bucket start times plus sum/count/max of the ``n`` buckets ending at ``end_timestamp``"""
+        n = min(n, self.size)
+        end = int(end_timestamp // self.width)
+        buckets = np.arange(end - n + 1, end + 1, dtype=np.int64)
+        slots = buckets % self.size
+        valid = self.bucket[slots] == buckets
+        return (
+            buckets * self.width,
+            np.where(valid, self.sum[slots], 0.0),
+            np.where(valid, self.count[slots], 0),
+            np.where(valid, self.max[slots], 0.0),
+        )
+
+
+class QueueAggregator:
+    """Per-camera, multi-resolution aggregation of queue observations"""
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, camera, value, timestamp=None, metric='queue_length'):
+        """Fold one observation into every resolution (O(1))"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            rings = self._series.get((camera, metric))
+            if rings is None:
+                rings = self._series[(camera, metric)] = {
+                    name: RingSeries(width, size) for name, (width, size) in self.resolutions.items()
+                }
+            for ring in rings.values():
+                ring.add(timestamp, value)
+
+    def observe_result(self, camera, result, timestamp=None, zones=None, inferred=True):
+        """Record queue length, box count and per-zone person counts of one frame; returns them.
+
+        The box count is summed per bucket, so it is left out for frames that
+        reuse an earlier frame's boxes (``inferred=False``).
+        """
+        values = {'queue_length': int(queue_mask(result, zones).sum())}
+        if inferred:
+            values['detections'] = len(result.boxes)
+        if zones:
+            for name, people in zone_counts(result, zones, person_mask(result)).items():
+                values[f"zone:{name}"] = people
+        for metric, value in values.items():
+            self.observe(camera, value, timestamp, metric=metric)
+        return values
+
+    def metrics(self, prefix=''):
+        with self._lock:
+            return sorted({name for _, name in self._series if name.startswith(prefix)})
+
+    def cameras(self, metric='queue_length'):
+        with self._lock:
+            return sorted({camera for camera, name in self._series if name == metric})
+
+    def completed_buckets(self, resolution='1min', since=0, end=None):
+        """``(camera, metric, bucket_start, sum, count, max)`` of every finished bucket starting at or after ``since``"""
+        end = time.time() if end is None else end
+        width, _ = self.resolutions[resolution]
+        first, current = int(since // width), int(end // width)
+        rows = []
+        with self._lock:
+            for (camera, metric), rings in self._series.items():
+                ring = rings[resolution]
+                slots = np.flatnonzero((ring.bucket >= first) & (ring.bucket < current) & (ring.count > 0))
+                for slot in slots[np.argsort(ring.bucket[slots])]:
+                    rows.append((
+                        camera, metric, int(ring.bucket[slot]) * width,
+                        float(ring.sum[slot]), int(ring.count[slot]), float(ring.max[slot])
+                    ))
+        return rows
+
+    def series(self, metric='queue_length', resolution='1h', n=24, cameras=None, end=None, stat='mean', combine='sum'):
+        """Per-bucket values over the last ``n`` buckets.
+
+        Each camera contributes its bucket ``stat`` (``'mean'`` or ``'sum'``);
+        cameras are then summed (``combine='sum'``, e.g. total people queuing)
+        or averaged (``combine='mean'``, e.g. wait times). Buckets without data
+        are NaN. Returns ``(bucket_start_timestamps, values, peaks)``.
+        """
+        end = time.time() if end is None else end
+        width, _ = self.resolutions[resolution]
+        starts = (np.arange(-n + 1, 1, dtype=np.int64) + int(end // width)) * width
+        total = np.zeros(n)
+        peaks = np.zeros(n)
+        contributors = np.zeros(n, dtype=np.int64)
+        with self._lock:
+            for (camera, name), rings in self._series.items():
+                if name != metric or (cameras is not None and camera not in cameras):
+                    continue
+                _, sums, counts, maxes = rings[resolution].window(end, n)
+                has_data = counts > 0
+                if stat == 'sum':
+                    total += sums
+                else:
+                    total += np.where(has_data, sums / np.maximum(counts, 1), 0.0)
+                peaks = np.maximum(peaks, maxes)
+                contributors += has_data
+        values = np.where(contributors > 0, total, np.nan)
+        if combine == 'mean':
+            values = values / np.maximum(contributors, 1)
+        return starts, values, peaks
@@ -0,0 +1,76 @@
+"""Re-apply confidence/IoU thresholds to cached detection candidates.
+
+A single low-threshold forward pass keeps (almost) every candidate box the
+network produced. Changing the confidence or IoU sliders afterwards only
+needs a vectorized filter and NMS over those cached boxes, not another
+forward pass.
+
+The result matches ``predict`` at the same thresholds except at the image
+border: ultralytics runs NMS on the letterboxed boxes before clipping them to
+the image, while the cached candidates are already clipped. Two overlapping
+boxes that both reach past an edge can overlap more after clipping, so the
+re-filter may suppress a border box that ``predict`` keeps. Boxes inside the
+image are filtered exactly.
+"""
+import numpy as np
+
+from optiqueue.lazy_imports import torch
+
+# Loosest thresholds used for the candidate pass. IoU 1.0 disables NMS so
+# that any stricter IoU can be applied later (see the border caveat above).
+CANDIDATE_CONF = 0.01
+CANDIDATE_IOU = 1.0
+CANDIDATE_MAX_DET = 3000
+
+# Same class offset trick as ultralytics' class-aware NMS
+MAX_WH = 7680
+
+
+def predict_candidates(model, source, cache=None, image_bytes=None, **kwargs):
+    """Run one forward pass that keeps every candidate box"""
+    kwargs.update(conf=CANDIDATE_CONF, iou=CANDIDATE_IOU, max_det=CANDIDATE_MAX_DET)
+    if cache is not None and image_bytes is not None:
+        return cache.predict(model, source, image_bytes, **kwargs)[0]
+    return model.predict(source, **kwargs)[0]
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy NMS over (N, 4) xyxy boxes, returns kept indices by score"""
+    order = np.argsort(-scores, kind='stable')
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def filter_candidates(data, conf, iou, max_det=300, agnostic=False):
+    """Filter an (N, 6) [x1, y1, x2, y2, conf, cls] array by conf, then NMS"""
+    # Strictly above the threshold, like ultralytics' NMS
+    data = data[data[:, 4] > conf]
+    if len(data) == 0 or iou >= 1.0:
+        return data[np.argsort(-data[:, 4], kind='stable')][:max_det]
+    offsets = 0.0 if agnostic else data[:, 5:6] * MAX_WH
+    keep = nms(data[:, :4] + offsets, data[:, 4], iou)
+    return data[keep[:max_det]]
+
+
+def refilter(candidates, conf, iou, max_det=300):
+    """Return a new ``Results`` with thresholds applied to cached candidates.
+
+    Border boxes can differ from a real ``predict``; see the module docstring.
+    """
+    data = candidates.boxes.data.cpu().numpy()
+    filtered = filter_candidates(data, conf, iou, max_det=max_det)
+    result = candidates.new()
+    result.update(boxes=torch.from_numpy(np.ascontiguousarray(filtered)))
+    return result
@@ -0,0 +1,156 @@
+"""Region-of-interest inference: detect on a crop, report on the full frame.
+
+A camera's ROI is a crop rectangle (fractions of the frame, or the bounding
+rectangle of its zones) plus an optional downscale factor. Only the crop is
+sent to the model, letterboxed to its own size rounded up to the model
+stride instead of being upscaled to ``imgsz``, so a smaller region means a
+smaller input tensor. The boxes are then mapped back to full-frame pixels
+and wrapped in a new ``Results`` on the original frame, so annotation, zones
+and tracking never see the crop.
+"""
+import math
+import threading
+
+from optiqueue.lazy_imports import cv2, ultralytics_results
+from optiqueue.zones import zones_bounding_rect
+
+
+def parse_rect(text):
+    """Parse ``x1,y1,x2,y2`` fractions of the frame (blank = None); raises ValueError"""
+    if not text.strip():
+        return None
+    try:
+        rect = [float(value) for value in text.split(',')]
+    except ValueError:
+        raise ValueError("expected 'x1,y1,x2,y2'")
+    if len(rect) != 4:
+        raise ValueError("expected 'x1,y1,x2,y2'")
+    if any(not 0 <= value <= 1 for value in rect):
+        raise ValueError("coordinates are fractions of the frame (0 to 1)")
+    if rect[0] >= rect[2] or rect[1] >= rect[3]:
+        raise ValueError("x2 and y2 must be greater than x1 and y1")
+    return rect
+
+
+def format_rect(rect):
+    return ','.join(f"{value:g}" for value in rect) if rect else ''
+
+
+def resolve_roi(settings, zones=None):
+    """ROI of a camera's ``{'rect', 'crop_to_zones', 'scale'}`` settings, or None for full frames"""
+    if not settings:
+        return None
+    roi = {
+        'rect': settings.get('rect'),
+        'zones': zones if settings.get('crop_to_zones') and zones else None,
+        'scale': float(settings.get('scale') or 1.0),
+    }
+    if roi['rect'] is None and roi['zones'] is None and roi['scale'] >= 1.0:
+        return None
+    return roi
+
+
+def roi_rect(roi, width, height):
+    """Pixel ``(x1, y1, x2, y2)`` of the crop, or None for the whole frame"""
+    if roi.get('rect'):
+        x1, y1, x2, y2 = roi['rect']
+        return (
+            int(x1 * width), int(y1 * height),
+            max(int(math.ceil(x2 * width)), int(x1 * width) + 1),
+            max(int(math.ceil(y2 * height)), int(y1 * height) + 1),
+        )
+    if roi.get('zones'):
+        return zones_bounding_rect(roi['zones'], width, height)
+    return None
+
+
+def model_input_shape(height, width, imgsz=640, stride=32, upscale=False):
+    """(h, w) an image is letterboxed to: longest side at most ``imgsz``, padded to the stride"""
+    ratio = imgsz / max(height, width)
+    if not upscale:
+        ratio = min(ratio, 1.0)
+    return (
+        int(math.ceil(height * ratio / stride) * stride),
+        int(math.ceil(width * ratio / stride) * stride),
+    )
+
+
+def crop_frame(frame, roi):
+    """Image the model sees plus the ``(x0, y0, sx, sy)`` transform back to ``frame``"""
+    height, width = frame.shape[:2]
+    rect = roi_rect(roi, width, height)
+    x0, y0 = 0, 0
+    if rect is not None:
+        x0, y0, x1, y1 = rect
+        frame = frame[y0:y1, x0:x1]
+    crop_h, crop_w = frame.shape[:2]
+    scale = roi.get('scale', 1.0)
+    if scale < 1.0:
+        size = (max(1, round(crop_w * scale)), max(1, round(crop_h * scale)))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return frame, (x0, y0, frame.shape[1] / crop_w, frame.shape[0] / crop_h)
+
+
+def restore_result(result, frame, transform):
+    """``Results`` on the full ``frame`` with the crop's boxes mapped back to it"""
+    x0, y0, sx, sy = transform
+    data = result.boxes.data.clone()
+    data[:, 0:4:2] = data[:, 0:4:2] / sx + x0
+    data[:, 1:4:2] = data[:, 1:4:2] / sy + y0
+    restored = ultralytics_results.Results(frame, path=result.path, names=result.names, boxes=data)
+    restored.speed = result.speed
+    if hasattr(result, 'batch_seconds'):
+        restored.batch_seconds = result.batch_seconds
+    return restored
+
+
+class RoiStats:
+    """Pixels and inference time of ROI frames against their full-frame equivalent"""
+
+    def __init__(self, imgsz=640):
+        self.imgsz = imgsz
+        self.frames = 0
+        self.frame_pixels = 0
+        self.crop_pixels = 0
+        self.full_input_pixels = 0
+        self.input_pixels = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, frame_shape, crop_shape, seconds):
+        full_h, full_w = model_input_shape(*frame_shape[:2], self.imgsz, upscale=True)
+        input_h, input_w = model_input_shape(*crop_shape[:2], self.imgsz)
+        with self._lock:
+            self.frames += 1
+            self.frame_pixels += frame_shape[0] * frame_shape[1]
+            self.crop_pixels += crop_shape[0] * crop_shape[1]
+            self.full_input_pixels += full_h * full_w
+            self.input_pixels += input_h * input_w
+            self.seconds += seconds
+
+    def merge(self, other):
+        with self._lock, other._lock:
+            self.frames += other.frames
+            self.frame_pixels += other.frame_pixels
+            self.crop_pixels += other.crop_pixels
+            self.full_input_pixels += other.full_input_pixels
+            self.input_pixels += other.input_pixels
+            self.seconds += other.seconds
+        return self
+
+    def summary(self):
+        with self._lock:
+            if self.frames == 0:
+                return {'frames': 0, 'pixel_reduction': 0.0, 'input_reduction': 0.0,
+                        'latency_ms': 0.0, 'latency_saved_ms': 0.0}
+            latency_ms = self.seconds / self.frames * 1000
+            # Detector compute grows with the letterboxed input area, so the
+            # full-frame latency is estimated from the measured ROI latency
+            saved_ms = latency_ms * (self.full_input_pixels / self.input_pixels - 1)
+            return {
+                'frames': self.frames,
+                'pixel_reduction': 1 - self.crop_pixels / self.frame_pixels,
+                'input_reduction': 1 - self.input_pixels / self.full_input_pixels,
+                'latency_ms': latency_ms,
+                'latency_saved_ms': saved_ms,
+            }
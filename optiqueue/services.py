@@ -0,0 +1,285 @@
+"""Process-wide singletons shared by every Streamlit session."""
+import os
+
+import streamlit as st
+
+from optiqueue.backends import load_backend_choice, save_backend_choice
+from optiqueue.batching import InferenceBatcher
+from optiqueue.camera_ingest import CameraIngest
+from optiqueue.camera_registry import CameraRegistry
+from optiqueue.camera_scheduler import CameraScheduler
+from optiqueue.detection_archive import DetectionArchive
+from optiqueue.detection_buffer import DetectionBuffer
+from optiqueue.detection_cache import DetectionCache
+from optiqueue.detection_store import DetectionStore
+from optiqueue.heatmap import HeatmapAccumulator
+from optiqueue.inference_config import InferenceConfig
+from optiqueue.model_pool import DEFAULT_WEIGHTS, ModelPool
+from optiqueue.model_registry import ModelRegistry
+from optiqueue.queue_metrics import QueueAggregator, queue_mask
+from optiqueue.tracking import QueueTracker
+from optiqueue.video_jobs import VideoJobManager, aggregate_source
+from optiqueue.zones import ZoneRegistry
+
+DATA_DIR = os.environ.get('OPTIQUEUE_DATA_DIR', '.optiqueue')
+BACKEND_PATH = os.path.join(DATA_DIR, 'backend.json')
+EXPORT_DIR = os.path.join(DATA_DIR, 'exports')
+MODELS_DIR = os.path.join(DATA_DIR, 'models')
+INFERENCE_CONFIG_PATH = os.path.join(DATA_DIR, 'inference.json')
+CAMERAS_PATH = os.path.join(DATA_DIR, 'cameras.json')
+
+
+@st.cache_resource
+def load_inference_config():
+    """Shared inference settings (thresholds, imgsz, max_det, classes, FP16, batch size)"""
+    return InferenceConfig(
+        INFERENCE_CONFIG_PATH,
+        defaults={'batch_size': int(os.environ.get('OPTIQUEUE_BATCH_SIZE', 8))}
+    )
+
+
+@st.cache_resource
+def load_model_registry():
+    """Shared versioned model registry; best.pt becomes the first version"""
+    registry = ModelRegistry(MODELS_DIR)
+    if registry.active() is None and os.path.exists(DEFAULT_WEIGHTS):
+        registry.activate(registry.add_file(DEFAULT_WEIGHTS)['id'])
+    return registry
+
+
+def _parse_sizes(text):
+    return tuple(int(value) for value in str(text).split(',') if value.strip())
+
+
+@st.cache_resource(show_spinner="Loading and warming up the model...")
+def load_model_pool_status():
+    """Load the shared YOLO model pool once per process, on the registry's active version.
+
+    Every instance is warmed up at each configured image size and at both the
+    single-image and micro-batch sizes before the pool is returned; sizes
+    saved later are warmed up in the background. Returns
+    ``(pool, None)``, or ``(None, error)`` when the weights could not be loaded.
+    """
+    try:
+        config = load_inference_config()
+        registry = load_model_registry()
+        version = registry.active()
+        weights = registry.path(version) if version else DEFAULT_WEIGHTS
+        options = {
+            'size': int(os.environ.get('OPTIQUEUE_POOL_SIZE', 2)),
+            'torch_threads': os.environ.get('OPTIQUEUE_TORCH_THREADS'),
+            'artifact_dir': EXPORT_DIR,
+            'warmup_imgsz': _parse_sizes(os.environ.get('OPTIQUEUE_WARMUP_IMGSZ', '')) + (config['imgsz'],),
+            'warmup_batch_sizes': (1, config['batch_size']),
+        }
+        backend = load_backend_choice(BACKEND_PATH, os.environ.get('OPTIQUEUE_BACKEND', 'pytorch'))
+        try:
+            pool = ModelPool(weights, backend=backend, **options)
+        except Exception:
+            if backend == 'pytorch':
+                raise
+            # A backend whose runtime is missing must not take detection down
+            pool = ModelPool(weights, **options)
+        # A saved image or batch size is warmed up before requests reach it
+        config.on_update = lambda values: pool.warm_up_async(values['imgsz'], values['batch_size'])
+        return pool, None
+    except Exception as e:
+        return None, e
+
+
+def load_model_pool():
+    """The shared YOLO model pool, or None if it could not be loaded"""
+    return load_model_pool_status()[0]
+
+
+def model_load_error():
+    """The exception that kept the model pool from loading, or None"""
+    return load_model_pool_status()[1]
+
+
+def activate_model_version(version_id):
+    """Start serving a registry version without restarting the app.
+
+    The new weights load and warm up in the background while detection keeps
+    running on the current ones; the registry's active pointer only moves once
+    they serve, so a version that fails to load changes nothing. Returns False
+    while another activation is still loading.
+    """
+    registry = load_model_registry()
+    version = registry.get(version_id)
+    pool = load_model_pool()
+    if pool is None:
+        # Nothing is serving yet, so the model services are simply rebuilt on the next run
+        registry.activate(version_id)
+        for loader in (load_model_pool_status, load_batcher, load_video_jobs, load_camera_scheduler):
+            loader.clear()
+        return True
+
+    def on_ready():
+        registry.activate(version_id)
+        save_backend_choice(BACKEND_PATH, pool.backend)
+
+    return pool.activate_async(registry.path(version), on_ready=on_ready)
+
+
+@st.cache_resource
+def load_detection_cache():
+    """Shared detection cache; the disk tier is disabled when its budget is 0"""
+    disk_mb = int(os.environ.get('OPTIQUEUE_DETECTION_CACHE_MB', 256))
+    return DetectionCache(
+        max_entries=1024,
+        disk_dir=os.path.join(DATA_DIR, 'detection_cache'),
+        disk_max_bytes=disk_mb * 1024 * 1024
+    )
+
+
+@st.cache_resource
+def load_queue_metrics():
+    """Shared per-camera queue-length time series"""
+    return QueueAggregator()
+
+
+@st.cache_resource
+def load_detection_store():
+    """Shared persistent detection log (SQLite, batched writes)"""
+    return DetectionStore(os.environ.get('OPTIQUEUE_DB', os.path.join(DATA_DIR, 'detections.db')))
+
+
+@st.cache_resource
+def load_detection_archive():
+    """Shared Parquet history, rolled from the detection store in the background"""
+    archive = DetectionArchive(
+        os.path.join(DATA_DIR, 'archive'),
+        store=load_detection_store(),
+        queue_metrics=load_queue_metrics(),
+        raw_retention_days=int(os.environ.get('OPTIQUEUE_RAW_RETENTION_DAYS', 7)),
+        hot_retention_hours=int(os.environ.get('OPTIQUEUE_HOT_RETENTION_HOURS', 24)),
+        interval=int(os.environ.get('OPTIQUEUE_ARCHIVE_INTERVAL_S', 300))
+    )
+    archive.start()
+    return archive
+
+
+@st.cache_resource
+def load_detection_buffer():
+    """Shared in-memory ring of recent detections for fast aggregation"""
+    return DetectionBuffer(capacity=int(os.environ.get('OPTIQUEUE_BUFFER_ROWS', 100_000)))
+
+
+@st.cache_resource
+def load_heatmap():
+    """Shared weekday x hour queue-length heatmap, persisted under the data directory"""
+    return HeatmapAccumulator(os.path.join(DATA_DIR, 'heatmap.npz'))
+
+
+@st.cache_resource
+def load_queue_tracker():
+    """Shared per-camera person tracker that measures wait times"""
+    return QueueTracker(max_lost=float(os.environ.get('OPTIQUEUE_TRACK_LOST_S', 2)))
+
+
+@st.cache_resource
+def load_camera_registry():
+    """Shared, persisted list of configured cameras"""
+    return CameraRegistry(CAMERAS_PATH)
+
+
+@st.cache_resource
+def load_zone_registry():
+    """Shared polygon zones of every camera"""
+    return ZoneRegistry()
+
+
+@st.cache_resource
+def load_result_recorder():
+    """Callback that records one frame in the metrics, heatmap, tracker, detection buffer and store.
+
+    Video frames that reuse the previous inferred frame's boxes
+    (``inferred=False``) only add their queue observations, so sampled
+    videos do not count the same detections several times. All video jobs
+    share one source in the queue metrics, heatmap and detection buffer, so
+    their memory does not grow with the number of uploads.
+    """
+    queue_metrics = load_queue_metrics()
+    detection_buffer = load_detection_buffer()
+    detection_store = load_detection_store()
+    heatmap = load_heatmap()
+    queue_tracker = load_queue_tracker()
+    zone_registry = load_zone_registry()
+
+    def record_wait(camera_id, wait, timestamp):
+        queue_metrics.observe(aggregate_source(camera_id), wait / 60, timestamp, metric='wait_time')
+        detection_store.add_observations(camera_id, {'wait_time': wait / 60}, timestamp)
+
+    # Also gets the waits of tracks ended by idle cameras and finished videos
+    queue_tracker.on_wait = record_wait
+
+    def record(camera_id, result, timestamp, inferred=True):
+        zones = zone_registry.get(camera_id)
+        source = aggregate_source(camera_id)
+        values = queue_metrics.observe_result(source, result, timestamp, zones=zones, inferred=inferred)
+        detection_store.add_observations(camera_id, values, timestamp)
+        if not inferred:
+            return
+        heatmap.observe(source, values['queue_length'], timestamp)
+        # Wait times are only measured for people standing in the queue zones;
+        # the tracker hands finished ones to record_wait
+        queue_tracker.update_result(camera_id, result, timestamp, mask=queue_mask(result, zones))
+        detection_buffer.append_result(source, result, timestamp)
+        detection_store.add_result(camera_id, result, timestamp)
+
+    return record
+
+
+@st.cache_resource
+def load_batcher():
+    """Shared micro-batcher in front of the model pool, or None without a model"""
+    pool = load_model_pool()
+    if pool is None:
+        return None
+    return InferenceBatcher(
+        pool,
+        max_wait=int(os.environ.get('OPTIQUEUE_BATCH_WAIT_MS', 20)) / 1000,
+        config=load_inference_config()
+    )
+
+
+@st.cache_resource
+def load_video_jobs():
+    """Shared background video job manager, or None without a model"""
+    batcher = load_batcher()
+    if batcher is None:
+        return None
+    return VideoJobManager(
+        batcher,
+        os.path.join(DATA_DIR, 'video_jobs'),
+        workers=int(os.environ.get('OPTIQUEUE_VIDEO_WORKERS', 1)),
+        on_result=load_result_recorder(),
+        on_finished=load_queue_tracker().finish
+    )
+
+
+@st.cache_resource
+def load_camera_ingest():
+    """Shared camera readers; one thread per configured camera URL"""
+    return CameraIngest(
+        backoff_initial=float(os.environ.get('OPTIQUEUE_RECONNECT_MIN_S', 1)),
+        backoff_max=float(os.environ.get('OPTIQUEUE_RECONNECT_MAX_S', 30))
+    )
+
+
+@st.cache_resource
+def load_camera_scheduler():
+    """Shared round-robin detection scheduler over all camera buffers"""
+    pool = load_model_pool()
+    if pool is None:
+        return None
+    scheduler = CameraScheduler(
+        load_camera_ingest(),
+        pool,
+        target_hz=float(os.environ.get('OPTIQUEUE_CAMERA_HZ', 2)),
+        on_result=load_result_recorder(),
+        config=load_inference_config()
+    )
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,109 @@
+"""Tiled (SAHI-style) inference for high-resolution frames.
+
+A 4K frame letterboxed to 640 pixels shrinks a person's head to a few
+pixels. Tiled inference cuts the frame into overlapping ``imgsz`` tiles that
+the model sees at native resolution, plus the whole frame for objects larger
+than a tile. Every piece goes through one batched forward pass, then the
+boxes are shifted back into frame coordinates and merged with class-aware
+NMS across tiles.
+"""
+import math
+
+import numpy as np
+
+from optiqueue.detection_cache import to_orig_img
+from optiqueue.lazy_imports import torch, ultralytics_results
+from optiqueue.refilter import filter_candidates
+
+TILE_OVERLAP = 0.2
+
+
+def tile_starts(length, tile_size, overlap=TILE_OVERLAP):
+    """Evenly spread tile offsets along one axis with at least ``overlap`` shared"""
+    if length <= tile_size:
+        return [0]
+    step = tile_size * (1 - overlap)
+    n = math.ceil((length - tile_size) / step) + 1
+    return [round(i * (length - tile_size) / (n - 1)) for i in range(n)]
+
+
+def tile_grid(height, width, tile_size=640, overlap=TILE_OVERLAP):
+    """Pixel ``(x1, y1, x2, y2)`` of the tiles covering a height x width frame"""
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in tile_starts(height, tile_size, overlap)
+        for x in tile_starts(width, tile_size, overlap)
+    ]
+
+
+def tile_image(image, tile_size=640, overlap=TILE_OVERLAP):
+    """``(piece, (x0, y0, 1, 1))`` for every tile, then the whole image as a last piece.
+
+    A frame that fits in one tile is returned as a single piece.
+    """
+    height, width = image.shape[:2]
+    grid = tile_grid(height, width, tile_size, overlap)
+    if len(grid) == 1:
+        return [(image, (0, 0, 1.0, 1.0))]
+    pieces = [(image[y1:y2, x1:x2], (x1, y1, 1.0, 1.0)) for x1, y1, x2, y2 in grid]
+    pieces.append((image, (0, 0, 1.0, 1.0)))
+    return pieces
+
+
+def merge_results(results, transforms, frame, iou=0.7, max_det=300):
+    """One ``Results`` on ``frame`` from per-piece results and their ``(x0, y0, sx, sy)`` transforms"""
+    parts = []
+    for result, (x0, y0, sx, sy) in zip(results, transforms):
+        data = result.boxes.data.cpu().numpy()[:, :6].copy()
+        data[:, 0:4:2] = data[:, 0:4:2] / sx + x0
+        data[:, 1:4:2] = data[:, 1:4:2] / sy + y0
+        parts.append(data)
+    data = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+    # The same object seen by neighbouring tiles overlaps itself; NMS keeps the best box
+    merged = filter_candidates(data, 0.0, iou, max_det=max_det)
+    return ultralytics_results.Results(
+        frame, path=results[0].path, names=results[0].names,
+        boxes=torch.from_numpy(np.ascontiguousarray(merged))
+    )
+
+
+class TiledModel:
+    """``predict`` drop-in that runs a model (or batcher) over tiles of each image"""
+
+    def __init__(self, model, tile_size=640, overlap=TILE_OVERLAP):
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def task(self):
+        return self.model.task
+
+    @property
+    def checksum(self):
+        # Tiled results are cached apart from whole-frame results
+        return f"{self.model.checksum}:tiles-{self.tile_size}-{self.overlap}"
+
+    def predict(self, source, conf=0.25, iou=0.7, max_det=300, **kwargs):
+        kwargs.pop('imgsz', None)
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        frames = [to_orig_img(item) for item in sources]
+        pieces = [tile_image(frame, self.tile_size, self.overlap) for frame in frames]
+        # Tiles of every image share one batched forward pass
+        results = self.model.predict(
+            [piece for frame_pieces in pieces for piece, _ in frame_pieces],
+            conf=conf, iou=iou, max_det=max_det, imgsz=self.tile_size, **kwargs
+        )
+        merged = []
+        start = 0
+        for frame, frame_pieces in zip(frames, pieces):
+            end = start + len(frame_pieces)
+            merged.append(merge_results(
+                results[start:end], [transform for _, transform in frame_pieces], frame, iou, max_det
+            ))
+            start = end
+        return merged
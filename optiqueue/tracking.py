@@ -0,0 +1,256 @@
+"""Lightweight multi-object tracking of people for counting and wait times.
+
+A CPU-only, ByteTrack-style tracker: high-confidence detections are matched
+to the tracks' motion-predicted boxes by IoU first, then low-confidence
+detections get a second chance against the remaining tracks, which keeps
+ids stable through partial occlusion. Tracks are predicted with a constant
+velocity in seconds rather than frames, so association still works when
+detection runs at a low rate. Lost tracks are evicted after a time window
+and their dwell time (last seen - first seen) becomes a measured wait time.
+"""
+import threading
+import time
+from collections import deque
+from itertools import count
+
+import numpy as np
+
+from optiqueue.queue_metrics import person_mask
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(iou, threshold):
+    """Greedy highest-IoU-first assignment; returns (pairs, unmatched rows, unmatched cols)"""
+    pairs = []
+    if iou.size:
+        rows, cols = np.nonzero(iou >= threshold)
+        order = np.argsort(-iou[rows, cols], kind='stable')
+        used_rows, used_cols = set(), set()
+        for i in order:
+            row, col = rows[i], cols[i]
+            if row in used_rows or col in used_cols:
+                continue
+            used_rows.add(row)
+            used_cols.add(col)
+            pairs.append((row, col))
+    matched_rows = {row for row, _ in pairs}
+    matched_cols = {col for _, col in pairs}
+    return (
+        pairs,
+        [row for row in range(iou.shape[0]) if row not in matched_rows],
+        [col for col in range(iou.shape[1]) if col not in matched_cols],
+    )
+
+
+class Track:
+    __slots__ = ('id', 'box', 'velocity', 'score', 'first_seen', 'last_seen', 'hits')
+
+    def __init__(self, track_id, box, score, timestamp):
+        self.id = track_id
+        self.box = box
+        self.velocity = np.zeros(4)
+        self.score = score
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+
+    def predict(self, timestamp):
+        return self.box + self.velocity * (timestamp - self.last_seen)
+
+    def update(self, box, score, timestamp):
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            # Exponentially smoothed velocity in pixels per second
+            self.velocity = 0.5 * self.velocity + 0.5 * (box - self.box) / dt
+        self.box = box
+        self.score = score
+        self.last_seen = timestamp
+        self.hits += 1
+
+
+class PersonTracker:
+    """Tracks of one camera"""
+
+    def __init__(self, iou_threshold=0.3, high_conf=0.5, low_conf=0.1, min_hits=3, max_lost=2.0, max_tracks=500):
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.min_hits = min_hits
+        self.max_lost = max_lost
+        self.max_tracks = max_tracks
+        self.tracks = []
+        self.last_update = None
+        self.confirmed_total = 0
+        self._ids = count(1)
+
+    def confirmed(self, track):
+        return track.hits >= self.min_hits
+
+    def update(self, boxes, scores, timestamp):
+        """Associate one frame's detections; returns wait times (s) of tracks that ended"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64)
+        self.last_update = timestamp
+        predicted = np.array([track.predict(timestamp) for track in self.tracks]).reshape(-1, 4)
+
+        high = np.flatnonzero(scores >= self.high_conf)
+        low = np.flatnonzero((scores >= self.low_conf) & (scores < self.high_conf))
+
+        # First pass: confident detections against every track
+        pairs, unmatched_tracks, unmatched_high = greedy_match(
+            box_iou(predicted, boxes[high]), self.iou_threshold
+        )
+        matches = [(track, high[det]) for track, det in pairs]
+
+        # Second pass: weak detections only keep existing tracks alive
+        remaining = np.array(unmatched_tracks, dtype=np.int64)
+        pairs, _, _ = greedy_match(box_iou(predicted[remaining], boxes[low]), self.iou_threshold)
+        matches += [(remaining[track], low[det]) for track, det in pairs]
+
+        for track_index, det in matches:
+            track = self.tracks[track_index]
+            was_confirmed = self.confirmed(track)
+            track.update(boxes[det], scores[det], timestamp)
+            if not was_confirmed and self.confirmed(track):
+                self.confirmed_total += 1
+
+        for det in unmatched_high:
+            self.tracks.append(Track(next(self._ids), boxes[high[det]], scores[high[det]], timestamp))
+
+        return self._evict(timestamp)
+
+    def _evict(self, timestamp):
+        waits = []
+        kept = []
+        for track in self.tracks:
+            if timestamp - track.last_seen > self.max_lost:
+                if self.confirmed(track):
+                    waits.append(track.last_seen - track.first_seen)
+            else:
+                kept.append(track)
+        if len(kept) > self.max_tracks:
+            # Drop the tracks that have gone unseen the longest
+            kept.sort(key=lambda track: track.last_seen, reverse=True)
+            kept = kept[:self.max_tracks]
+        self.tracks = kept
+        return waits
+
+    def finish(self):
+        """End every track (e.g. when the stream stops); returns their wait times"""
+        waits = [track.last_seen - track.first_seen for track in self.tracks if self.confirmed(track)]
+        self.tracks = []
+        return waits
+
+    def active(self):
+        """Confirmed tracks, including ones briefly lost (likely occluded)"""
+        return [track for track in self.tracks if self.confirmed(track)]
+
+    def current_waits(self, timestamp=None):
+        timestamp = self.last_update if timestamp is None else timestamp
+        return [timestamp - track.first_seen for track in self.active()]
+
+
+class QueueTracker:
+    """One ``PersonTracker`` per camera plus a bounded log of finished wait times.
+
+    Every finished wait, whether its track was lost, its camera went idle or
+    its video ended, is also passed to ``on_wait(camera, wait, timestamp)``.
+    """
+
+    def __init__(self, idle_timeout=600, max_waits=10_000, **tracker_options):
+        self.idle_timeout = idle_timeout
+        self.tracker_options = tracker_options
+        self.on_wait = None
+        self._trackers = {}
+        # Wall-clock time of each camera's last update; frame timestamps of
+        # videos are on the video's own clock, so idleness is not judged by them
+        self._updated_at = {}
+        self._waits = deque(maxlen=max_waits)
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+    def update_result(self, camera, result, timestamp=None, mask=None):
+        """Track the people in one inferred frame; returns wait times (s) that ended.
+
+        ``mask`` selects the boxes to track (default: every person box).
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if mask is None:
+            mask = person_mask(result)
+        boxes = result.boxes.xyxy.cpu().numpy()[mask]
+        scores = result.boxes.conf.cpu().numpy()[mask]
+        with self._lock:
+            tracker = self._trackers.get(camera)
+            if tracker is None:
+                tracker = self._trackers[camera] = PersonTracker(**self.tracker_options)
+            waits = tracker.update(boxes, scores, timestamp)
+            self._updated_at[camera] = time.time()
+            finished = [(camera, timestamp, wait) for wait in waits]
+            if time.time() - self._last_prune > 60:
+                finished += self._prune()
+            self._waits.extend((ended, wait) for _, ended, wait in finished)
+        self._report(finished)
+        return waits
+
+    def finish(self, camera):
+        """End every track of ``camera`` (e.g. when its video is done); returns their wait times"""
+        with self._lock:
+            tracker = self._trackers.pop(camera, None)
+            self._updated_at.pop(camera, None)
+            if tracker is None:
+                return []
+            waits = tracker.finish()
+            self._waits.extend((tracker.last_update, wait) for wait in waits)
+        self._report([(camera, tracker.last_update, wait) for wait in waits])
+        return waits
+
+    def _prune(self):
+        # Streams that stopped updating release their tracks
+        now = time.time()
+        self._last_prune = now
+        finished = []
+        for camera, tracker in list(self._trackers.items()):
+            if now - self._updated_at.get(camera, now) > self.idle_timeout:
+                finished += [(camera, tracker.last_update, wait) for wait in tracker.finish()]
+                del self._trackers[camera]
+                self._updated_at.pop(camera, None)
+        return finished
+
+    def _report(self, finished):
+        if self.on_wait is not None:
+            for camera, timestamp, wait in finished:
+                self.on_wait(camera, wait, timestamp)
+
+    def queue_lengths(self, cameras=None):
+        """Currently tracked people per camera"""
+        with self._lock:
+            return {
+                camera: len(tracker.active())
+                for camera, tracker in self._trackers.items()
+                if cameras is None or camera in cameras
+            }
+
+    def recent_waits(self, since):
+        """Wait times (s) of tracks that ended at or after ``since``"""
+        with self._lock:
+            return np.array([wait for ended, wait in self._waits if ended >= since])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cameras': len(self._trackers),
+                'tracks': sum(len(tracker.tracks) for tracker in self._trackers.values()),
+                'people_tracked': sum(tracker.confirmed_total for tracker in self._trackers.values()),
+                'waits_recorded': len(self._waits),
+            }
@@ -0,0 +1,150 @@
+"""Background video detection jobs that outlive Streamlit script runs.
+
+A submitted upload is written to disk and processed by a worker pool with
+``VideoPipeline``. Sessions keep only the job id, so reruns, navigation or a
+closed browser tab neither cancel nor restart the work.
+"""
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from optiqueue.video_pipeline import VideoPipeline
+
+# Every job is its own source (``video:<id>``) in the detection store and the
+# tracker, but the fixed-size in-memory aggregates fold them all into this one
+VIDEO_SOURCE = 'video'
+
+
+def aggregate_source(source):
+    """Source id under which ``source`` is kept in the in-memory aggregates"""
+    return VIDEO_SOURCE if source.startswith(f"{VIDEO_SOURCE}:") else source
+
+
+class VideoJob:
+    """State of one submitted video, updated by the worker thread"""
+
+    def __init__(self, job_id, filename, input_path, output_path, conf, iou, sampling=None, imgsz=640,
+                 options=None):
+        self.id = job_id
+        self.filename = filename
+        self.input_path = input_path
+        self.output_path = output_path
+        self.conf = conf
+        self.iou = iou
+        self.sampling = sampling
+        self.imgsz = imgsz
+        self.options = options or {}
+        self.status = 'queued'
+        self.frames_done = 0
+        self.total_frames = 0
+        self.summary = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def progress(self):
+        if self.status == 'done':
+            return 1.0
+        if self.total_frames <= 0:
+            return 0.0
+        return min(self.frames_done / self.total_frames, 1.0)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+
+class VideoJobManager:
+    """Queue of video jobs processed by a fixed-size worker pool"""
+
+    def __init__(self, batcher, jobs_dir, workers=1, max_jobs=50, on_result=None, on_finished=None):
+        self.batcher = batcher
+        self.on_result = on_result
+        self.on_finished = on_finished
+        self.jobs_dir = jobs_dir
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='video-job')
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def submit(self, data, filename, conf=0.25, iou=0.45, sampling=None, imgsz=640, **options):
+        """Store the upload and queue it; returns the new job id.
+
+        ``options`` are further predict arguments (max_det, classes, half).
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        ext = os.path.splitext(filename)[1] or '.mp4'
+        input_path = os.path.join(job_dir, f"input{ext}")
+        with open(input_path, 'wb') as f:
+            f.write(data)
+
+        job = VideoJob(
+            job_id, filename, input_path, os.path.join(job_dir, 'output.mp4'), conf, iou, sampling, imgsz, options
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+            self._evict_finished()
+        self._executor.submit(self._process, job)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def _process(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+
+        def on_progress(done, total):
+            job.frames_done = done
+            job.total_frames = total
+
+        source = f"{VIDEO_SOURCE}:{job.id}"
+
+        def on_result(index, seconds, result, selected):
+            # Frames are placed on the wall clock from the moment processing started
+            self.on_result(source, result, job.started_at + seconds, inferred=selected)
+
+        try:
+            pipeline = VideoPipeline(
+                self.batcher, conf=job.conf, iou=job.iou, sampling=job.sampling, imgsz=job.imgsz, **job.options
+            )
+            job.summary = pipeline.run(
+                job.input_path,
+                job.output_path,
+                progress_callback=on_progress,
+                result_callback=on_result if self.on_result is not None else None
+            )
+            job.frames_done = job.summary['frames']
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            if self.on_finished is not None:
+                # People still queueing when the video ends get their wait recorded
+                self.on_finished(source)
+
+    def _evict_finished(self):
+        # Keep the newest jobs; drop the oldest finished ones and their files
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.submitted_at
+        )
+        while len(self._jobs) > self.max_jobs and finished:
+            job = finished.pop(0)
+            del self._jobs[job.id]
+            shutil.rmtree(os.path.dirname(job.input_path), ignore_errors=True)
@@ -0,0 +1,265 @@
+"""Staged, multi-threaded video detection pipeline.
+
+Decode, inference, annotation and encode run concurrently and are connected
+by bounded queues::
+
+    decoder -> batched inference -> annotation workers -> encoder
+
+Inference goes through an ``InferenceBatcher``, so frames are grouped into
+forward passes of up to its ``batch_size`` frames. A ``FrameSelector``
+decides which frames are inferred at all; the others are annotated with
+the most recent detections. With a region of interest only the crop is
+sent to the model and the boxes are mapped back onto the full frame.
+
+The encoder reorders annotated frames by index, so the output video keeps
+the input frame order even though annotation runs on a worker pool.
+"""
+import queue
+import threading
+import time
+
+from optiqueue.frame_selection import FrameSelector
+from optiqueue.lazy_imports import cv2, ultralytics_results
+from optiqueue.roi import RoiStats, crop_frame, model_input_shape, restore_result
+
+_DONE = object()
+
+
+class StageStats:
+    """Frame count and busy time of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, frames, seconds):
+        with self._lock:
+            self.frames += frames
+            self.busy += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'stage': self.name,
+                'frames': self.frames,
+                'busy_s': round(self.busy, 3),
+                'fps': self.frames / self.busy if self.busy > 0 else 0.0,
+            }
+
+
+class VideoPipeline:
+    """Run detection over a video file and write an annotated copy"""
+
+    def __init__(self, batcher, conf=0.25, iou=0.45, sampling=None, roi=None, imgsz=640,
+                 annotate_workers=2, queue_size=32, **options):
+        self.batcher = batcher
+        self.conf = conf
+        self.iou = iou
+        # Further predict arguments such as max_det, classes and half
+        self.options = options
+        self.sampling = sampling
+        self.roi = roi
+        self.imgsz = imgsz
+        self.roi_stats = RoiStats(imgsz)
+        self.selector = None
+        self.annotate_workers = max(1, int(annotate_workers))
+        self.queue_size = queue_size
+
+        self.stats = {
+            name: StageStats(name)
+            for name in ('decode', 'select', 'inference', 'annotate', 'encode')
+        }
+        self.total_frames = 0
+        self.frames_written = 0
+        self.total_detections = 0
+        self.fps = 30.0
+        self.result_callback = None
+        self._stop = threading.Event()
+        self._error = None
+
+    def run(self, input_path, output_path, progress_callback=None, result_callback=None):
+        """Process ``input_path`` into ``output_path`` and return a summary.
+
+        ``progress_callback(frames_written, total_frames)`` is called from the
+        calling thread, so it may safely update Streamlit elements.
+        ``result_callback(index, video_seconds, result, selected)`` is called
+        from the encoder thread in frame order for every frame; ``selected``
+        is False for frames that reuse the last inferred frame's detections.
+        """
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video: {input_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fps = fps
+        self.result_callback = result_callback
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.selector = FrameSelector.from_settings(self.sampling, fps)
+        writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+        decoded = queue.Queue(self.queue_size)
+        inferred = queue.Queue(self.queue_size)
+        annotated = queue.Queue(self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._guard, args=(self._decode, cap, decoded), daemon=True),
+            threading.Thread(target=self._guard, args=(self._infer, decoded, inferred), daemon=True),
+            threading.Thread(target=self._guard, args=(self._encode, annotated, writer), daemon=True),
+        ]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._annotate, inferred, annotated), daemon=True)
+            for _ in range(self.annotate_workers)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            encoder = threads[2]
+            while encoder.is_alive():
+                encoder.join(timeout=0.1)
+                if progress_callback is not None:
+                    progress_callback(self.frames_written, self.total_frames)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            cap.release()
+            writer.release()
+
+        if self._error is not None:
+            raise self._error
+        elapsed = time.perf_counter() - start
+        return {
+            'frames': self.frames_written,
+            'detections': self.total_detections,
+            'inferred_frames': self.selector.selected,
+            'reused_frames': self.selector.skipped,
+            'elapsed': elapsed,
+            'fps': self.frames_written / elapsed if elapsed > 0 else 0.0,
+            'roi': self.roi_stats.summary() if self.roi else None,
+            'stages': [stats.as_dict() for stats in self.stats.values()],
+        }
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _decode(self, cap, out_q):
+        index = 0
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            self.stats['decode'].add(1, time.perf_counter() - start)
+            if not self._put(out_q, (index, frame)):
+                return
+            index += 1
+        self._put(out_q, _DONE)
+
+    def _infer(self, in_q, out_q):
+        # Selected frames are handed to the batcher one by one; it groups
+        # them into forward passes and the annotators wait on the futures.
+        # Skipped frames carry the future of the last selected frame.
+        last_future = None
+        transform = None
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+            index, frame = item
+            start = time.perf_counter()
+            selected = self.selector.select(index, frame)
+            self.stats['select'].add(1, time.perf_counter() - start)
+            if selected:
+                if self.roi:
+                    image, transform = crop_frame(frame, self.roi)
+                    shape = model_input_shape(*image.shape[:2], self.imgsz)
+                    last_future = self.batcher.submit(
+                        image, conf=self.conf, iou=self.iou, imgsz=list(shape), **self.options
+                    )
+                else:
+                    transform = None
+                    last_future = self.batcher.submit(
+                        frame, conf=self.conf, iou=self.iou, imgsz=self.imgsz, **self.options
+                    )
+            item = (index, last_future, transform, frame, selected)
+            if not self._put(out_q, item):
+                return
+        for _ in range(self.annotate_workers):
+            self._put(out_q, _DONE)
+
+    def _annotate(self, in_q, out_q):
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+            index, future, transform, frame, selected = item
+            result = future.result()
+            if selected:
+                seconds = getattr(result, 'batch_seconds', 0.0)
+                self.stats['inference'].add(1, seconds)
+                if transform is not None:
+                    self.roi_stats.add(frame.shape, result.orig_shape, seconds)
+            if transform is not None:
+                result = restore_result(result, frame, transform)
+            elif not selected:
+                result = ultralytics_results.Results(frame, path=result.path, names=result.names, boxes=result.boxes.data)
+            start = time.perf_counter()
+            frame = result.plot()
+            self.stats['annotate'].add(1, time.perf_counter() - start)
+            if not self._put(out_q, (index, frame, result, selected)):
+                return
+        self._put(out_q, _DONE)
+
+    def _encode(self, in_q, writer):
+        pending = {}
+        next_index = 0
+        finished_workers = 0
+        while finished_workers < self.annotate_workers:
+            item = self._get(in_q)
+            if item is _DONE:
+                if self._stop.is_set():
+                    return
+                finished_workers += 1
+                continue
+            index, frame, result, selected = item
+            pending[index] = (frame, result, selected)
+            # Write every frame that is now contiguous with the output
+            while next_index in pending:
+                frame, result, selected = pending.pop(next_index)
+                start = time.perf_counter()
+                writer.write(frame)
+                self.stats['encode'].add(1, time.perf_counter() - start)
+                if selected:
+                    # Reused frames repeat boxes that were already counted
+                    self.total_detections += len(result.boxes)
+                if self.result_callback is not None:
+                    self.result_callback(next_index, next_index / self.fps, result, selected)
+                next_index += 1
+                self.frames_written = next_index
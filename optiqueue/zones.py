@@ -0,0 +1,113 @@
+"""Per-camera polygon zones (queue lanes, service counters, exits).
+
+Zones are stored in normalized image coordinates (0..1) so they survive
+resolution changes. A box belongs to a zone when its footpoint (bottom
+centre, where the person stands) lies inside the polygon; the test is an
+even-odd ray cast vectorized over all boxes and polygon edges at once.
+"""
+import threading
+
+import numpy as np
+
+ZONE_TYPES = ('queue', 'service', 'exit')
+
+
+def parse_zones(text):
+    """Parse ``name | type | x,y x,y x,y ...`` lines into zone dicts; raises ValueError"""
+    zones = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) != 3:
+            raise ValueError(f"Line {line_no}: expected 'name | type | x,y x,y x,y'")
+        name, zone_type, coords = parts
+        if zone_type not in ZONE_TYPES:
+            raise ValueError(f"Line {line_no}: type must be one of {', '.join(ZONE_TYPES)}")
+        try:
+            points = [[float(value) for value in pair.split(',')] for pair in coords.split()]
+        except ValueError:
+            raise ValueError(f"Line {line_no}: points must be 'x,y' pairs")
+        if len(points) < 3 or any(len(point) != 2 for point in points):
+            raise ValueError(f"Line {line_no}: a zone needs at least 3 'x,y' points")
+        if any(not 0 <= value <= 1 for point in points for value in point):
+            raise ValueError(f"Line {line_no}: coordinates are fractions of the frame (0 to 1)")
+        zones.append({'name': name, 'type': zone_type, 'points': points})
+    return zones
+
+
+def format_zones(zones):
+    return '\n'.join(
+        f"{zone['name']} | {zone['type']} | " + ' '.join(f"{x:g},{y:g}" for x, y in zone['points'])
+        for zone in zones
+    )
+
+
+def footpoints(boxes):
+    """Bottom-centre point of (N, 4) xyxy boxes"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]))
+
+
+def points_in_polygon(points, polygon):
+    """Even-odd test of (N, 2) points against one (K, 2) polygon"""
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    spans = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = spans & (x < crossing_x)
+    return crossings.sum(axis=1) % 2 == 1
+
+
+def zone_membership(boxes, zones, shape):
+    """(N, Z) bool: box footpoint inside each zone; ``shape`` is the frame's (h, w)"""
+    height, width = shape[:2]
+    # Keep feet cut off by the frame edge inside zones that reach the edge
+    points = np.clip(footpoints(boxes) / np.array([width, height], dtype=np.float64), 0, 1 - 1e-9)
+    if not zones:
+        return np.zeros((len(points), 0), dtype=bool)
+    return np.column_stack([points_in_polygon(points, zone['points']) for zone in zones])
+
+
+def zone_counts(result, zones, mask=None):
+    """``{zone name: boxes in zone}`` for a ``Results``, optionally restricted by a box mask"""
+    boxes = result.boxes.xyxy.cpu().numpy()
+    if mask is not None:
+        boxes = boxes[mask]
+    membership = zone_membership(boxes, zones, result.orig_shape)
+    return {zone['name']: int(count) for zone, count in zip(zones, membership.sum(axis=0))}
+
+
+def zones_bounding_rect(zones, width, height, margin=0.05):
+    """Pixel ``(x1, y1, x2, y2)`` enclosing every zone plus a margin, or None without zones"""
+    if not zones:
+        return None
+    points = np.concatenate([np.asarray(zone['points'], dtype=np.float64) for zone in zones])
+    low = np.clip(points.min(axis=0) - margin, 0, 1)
+    high = np.clip(points.max(axis=0) + margin, 0, 1)
+    return (
+        int(low[0] * width), int(low[1] * height),
+        int(np.ceil(high[0] * width)), int(np.ceil(high[1] * height)),
+    )
+
+
+class ZoneRegistry:
+    """Zones of every camera, shared between sessions and the inference threads"""
+
+    def __init__(self):
+        self._zones = {}
+        self._lock = threading.Lock()
+
+    def set(self, camera_id, zones):
+        with self._lock:
+            if zones:
+                self._zones[camera_id] = zones
+            else:
+                self._zones.pop(camera_id, None)
+
+    def get(self, camera_id):
+        with self._lock:
+            return self._zones.get(camera_id, [])